@@ -1,9 +1,10 @@
 """
 Gradio application package for Intelligent CD Chatbot.
 
-This package contains the Gradio interface components and styling.
+This package contains the Gradio interface components, styling, and HTTP middleware.
 """
 
 from .interface import create_demo
+from .middleware import get_app_middleware
 
-__all__ = ['create_demo']
+__all__ = ['create_demo', 'get_app_middleware']
@@ -0,0 +1,88 @@
+"""
+HTTP middleware for the Intelligent CD Chatbot Gradio server.
+
+This module contains ASGI middleware that is attached to the FastAPI app
+created by `demo.launch` through its `app_kwargs`.
+"""
+
+from typing import Optional
+from urllib.parse import parse_qs
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .interface import STATIC_URL_PREFIX
+
+
+# Assets are referenced with a content hash, so they can be cached forever
+IMMUTABLE_CACHE_CONTROL = b"public, max-age=31536000, immutable"
+# The page and its config must always be revalidated to pick up new asset hashes
+NO_CACHE_CONTROL = b"no-cache"
+
+# Gradio's own frontend bundle, whose file names carry a content hash
+GRADIO_ASSETS_PREFIX = "/assets/"
+NO_CACHE_PATHS = frozenset({"/", "/config"})
+
+# Streaming endpoints (server-sent events) must not be buffered by the compressor
+STREAMING_PATH_MARKERS = ("/queue/", "/heartbeat", "/stream/")
+GZIP_MINIMUM_SIZE = 500
+
+
+def _is_content_addressed(path: str, query_string: bytes) -> bool:
+    """Whether the URL changes with its content: Gradio's bundle or an app asset with a ?v=<hash>"""
+    if path.startswith(GRADIO_ASSETS_PREFIX):
+        return True
+    return path.startswith(STATIC_URL_PREFIX) and "v" in parse_qs(query_string.decode("latin-1"))
+
+
+def _cache_control_for(path: str, query_string: bytes) -> Optional[bytes]:
+    """Return the Cache-Control value to enforce for a request URL, if any"""
+    if _is_content_addressed(path, query_string):
+        return IMMUTABLE_CACHE_CONTROL
+    if path in NO_CACHE_PATHS:
+        return NO_CACHE_CONTROL
+    return None
+
+
+class CacheControlMiddleware:
+    """Set Cache-Control headers: immutable for versioned assets, no-cache for the page and config"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        cache_control = _cache_control_for(scope["path"], scope.get("query_string", b"")) if scope["type"] == "http" else None
+        if cache_control is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cache_control(message: Message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = [(key, value) for key, value in message.get("headers", []) if key.lower() != b"cache-control"]
+                headers.append((b"cache-control", cache_control))
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cache_control)
+
+
+class CompressionMiddleware:
+    """Gzip responses except for streaming endpoints"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = GZIP_MINIMUM_SIZE):
+        self.app = app
+        self.gzip_app = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and not any(marker in scope["path"] for marker in STREAMING_PATH_MARKERS):
+            await self.gzip_app(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+
+def get_app_middleware() -> list[Middleware]:
+    """Return the middleware stack passed to the Gradio FastAPI app"""
+    return [
+        Middleware(CompressionMiddleware),
+        Middleware(CacheControlMiddleware),
+    ]
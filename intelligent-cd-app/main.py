@@ -15,12 +15,18 @@ The application will start a Gradio web interface accessible at http://localhost
 """
 
 import os
-import json
-from typing import Dict, Tuple
-from llama_stack_client import LlamaStackClient
-from utils import get_logger
+import time
+import logging
+import threading
+from functools import cache, lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import httpx
+import orjson
+from llama_stack_client import DefaultHttpxClient, LlamaStackClient
+from utils import QUEUE_CONCURRENCY_LIMIT, get_logger
 from tabs import ChatTab, MCPTestTab, RAGTestTab, SystemStatusTab
-from gradio_app import create_demo
+from gradio_app import create_demo, get_app_middleware
 
 
 
@@ -28,54 +34,151 @@ from gradio_app import create_demo
 # CONFIGURATION AND CLIENT INITIALIZATION
 # ============================================================================
 
-def get_extra_headers_config() -> dict:
-    """Configure MCP server authentication headers and return them"""
+# Local cache of the LLM model list, reused across restarts during development
+MODELS_CACHE_PATH = Path.home() / ".cache" / "intelligent-cd" / "models.json"
+MODELS_CACHE_TTL_SECONDS = 3600
+
+
+# Connection pool shared by all tabs for keep-alive connections to Llama Stack
+HTTP_MAX_CONNECTIONS = 64
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 32
+HTTP_TIMEOUT_SECONDS = 120.0
+# Fail fast when Llama Stack is unreachable instead of waiting for the full timeout
+HTTP_CONNECT_TIMEOUT_SECONDS = 5.0
+
+# MCP server URLs as registered in Llama Stack
+ARGOCD_MCP_SERVER_URL = "http://argocd-mcp-server:3000/sse"
+GITHUB_MCP_SERVER_URL = "https://api.githubcopilot.com/mcp/"
+
+
+@cache
+def get_mcp_headers() -> dict:
+    """Build the per MCP server authentication headers from the environment"""
+    argocd_url, argocd_token, github_auth_token, github_toolsets, github_readonly = (
+        os.getenv(name) for name in (
+            "ARGOCD_BASE_URL",
+            "ARGOCD_API_TOKEN",
+            "GITHUB_MCP_SERVER_AUTH_TOKEN",
+            "GITHUB_MCP_SERVER_TOOLSETS",
+            "GITHUB_MCP_SERVER_READONLY",
+        )
+    )
+    
+    # Return early if no MCP servers are configured
+    if not (argocd_url and argocd_token) and not github_auth_token:
+        return {}
+    
     mcp_headers = {}
     
     # Configure ArgoCD MCP server
-    argocd_url = os.getenv("ARGOCD_BASE_URL")
-    argocd_token = os.getenv("ARGOCD_API_TOKEN")
-    
     if argocd_url and argocd_token:
-        mcp_headers["http://argocd-mcp-server:3000/sse"] = {
+        mcp_headers[ARGOCD_MCP_SERVER_URL] = {
             "x-argocd-base-url": argocd_url,
             "x-argocd-api-token": argocd_token
         }
     
     # Configure GitHub MCP server
-    github_auth_token = os.getenv("GITHUB_MCP_SERVER_AUTH_TOKEN")
-    
     if github_auth_token:
         github_headers = {
             "Authorization": f"Bearer {github_auth_token}"
         }
         
         # Add optional toolsets header
-        github_toolsets = os.getenv("GITHUB_MCP_SERVER_TOOLSETS")
         if github_toolsets:
             github_headers["X-MCP-Toolsets"] = github_toolsets
         
         # Add optional readonly header
-        github_readonly = os.getenv("GITHUB_MCP_SERVER_READONLY")
         if github_readonly:
             github_headers["X-MCP-Readonly"] = github_readonly
         
-        mcp_headers["https://api.githubcopilot.com/mcp/"] = github_headers
+        mcp_headers[GITHUB_MCP_SERVER_URL] = github_headers
+    
+    return mcp_headers
+
+
+@cache
+def get_extra_headers_config() -> dict:
+    """Configure MCP server authentication headers and return them"""
+    mcp_headers = get_mcp_headers()
     
     # Return empty dict if no MCP servers are configured
     if not mcp_headers:
         return {}
     
-    # Return headers with MCP configuration
+    # Return headers with MCP configuration, serialized once
     return {
-        "X-LlamaStack-Provider-Data": json.dumps({
+        "X-LlamaStack-Provider-Data": orjson.dumps({
             "mcp_headers": mcp_headers
-        })
+        }).decode()
     }
 
 
+def _read_models_cache(llama_stack_url: str) -> Optional[Tuple[str, ...]]:
+    """Return the cached LLM models for the given URL if the cache is still fresh"""
+    try:
+        if time.time() - MODELS_CACHE_PATH.stat().st_mtime > MODELS_CACHE_TTL_SECONDS:
+            return None
+        cached = orjson.loads(MODELS_CACHE_PATH.read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+    
+    if cached.get("llama_stack_url") != llama_stack_url or not cached.get("llm_models"):
+        return None
+    return tuple(cached["llm_models"])
+
+
+def _write_models_cache(llama_stack_url: str, llm_models: Tuple[str, ...]) -> None:
+    """Persist the LLM models for the given URL, ignoring filesystem errors"""
+    try:
+        MODELS_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        MODELS_CACHE_PATH.write_bytes(orjson.dumps({"llama_stack_url": llama_stack_url, "llm_models": list(llm_models)}))
+    except OSError as e:
+        get_logger("main").debug(f"Could not write models cache: {e}")
+
+
+@lru_cache(maxsize=1)
+def _list_llm_models(client: LlamaStackClient) -> Tuple[str, ...]:
+    """List the LLMs served by Llama Stack, using the local cache when possible"""
+    llama_stack_url = str(client.base_url)
+    
+    llm_models = _read_models_cache(llama_stack_url)
+    if llm_models is None:
+        llm_models = tuple(m.identifier for m in client.models.list() if m.model_type == "llm")
+        if llm_models:
+            _write_models_cache(llama_stack_url, llm_models)
+    
+    return llm_models
+
+
+def _pick_default_model(client: LlamaStackClient) -> str:
+    """Pick the first LLM served by Llama Stack"""
+    llm_models = _list_llm_models(client)
+    if not llm_models:
+        raise RuntimeError(
+            f"No LLM models available in Llama Stack at {client.base_url}. "
+            "Register an LLM or set DEFAULT_LLM_MODEL."
+        )
+    return llm_models[0]
+
+
+def get_llama_stack_url() -> str:
+    """Return the Llama Stack server URL from the environment"""
+    return os.getenv("LLAMA_STACK_URL", "http://localhost:8321")
+
+
+def get_vector_db_id() -> str:
+    """Return the vector database ID from the environment"""
+    return os.getenv("VECTOR_DB_ID", "my_documents")
+
+
+# Serializes the first initialize_client() call between the warm-up thread and requests
+_client_lock = threading.Lock()
+
+
 def initialize_client() -> Tuple[LlamaStackClient, str, str, str]:
-    """Initialize Llama Stack client and return configuration
+    """Initialize Llama Stack client once and return configuration
+    
+    The first call connects to Llama Stack; later calls reuse the same client.
     
     Returns:
         Tuple containing:
@@ -84,37 +187,47 @@ def initialize_client() -> Tuple[LlamaStackClient, str, str, str]:
         - Vector database ID
         - Llama Stack URL
     """
+    with _client_lock:
+        return _initialize_client()
+
+
+@cache
+def _initialize_client() -> Tuple[LlamaStackClient, str, str, str]:
+    """Create the Llama Stack client and resolve the model, see initialize_client"""
     # Get logger for initialization
     logger = get_logger("main")
     
     # ALL CONFIGURATION IN ONE PLACE - including environment variable reading
-    llama_stack_url = os.getenv("LLAMA_STACK_URL", "http://localhost:8321")
+    llama_stack_url = get_llama_stack_url()
 
     extra_headers = get_extra_headers_config()
-    # Pretty print the extra headers with nested JSON parsing
-    if extra_headers and "X-LlamaStack-Provider-Data" in extra_headers:
-        try:
-            # Parse the nested JSON string
-            provider_data = json.loads(extra_headers["X-LlamaStack-Provider-Data"])
-            # Create a copy of extra_headers with parsed JSON
-            pretty_headers = extra_headers.copy()
-            pretty_headers["X-LlamaStack-Provider-Data"] = provider_data
-            logger.info(f"Extra headers: {json.dumps(pretty_headers, indent=2)}")
-        except json.JSONDecodeError:
-            logger.info(f"Extra headers: {json.dumps(extra_headers, indent=2)}")
-    else:
-        logger.info(f"Extra headers: {json.dumps(extra_headers, indent=2)}")
-
-    # Initialize client
+    # Headers carry credentials, so only log them at DEBUG level and from the in-memory dict
+    if logger.isEnabledFor(logging.DEBUG):
+        if extra_headers:
+            pretty_headers = {"X-LlamaStack-Provider-Data": {"mcp_headers": get_mcp_headers()}}
+        else:
+            pretty_headers = extra_headers
+        logger.debug("Extra headers: %s", pretty_headers)
+
+    # Initialize client with a pooled HTTP client so concurrent requests reuse connections
+    http_client = DefaultHttpxClient(
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS
+        ),
+        timeout=httpx.Timeout(HTTP_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS)
+    )
     llama_stack_client = LlamaStackClient(
         base_url=llama_stack_url,
-        default_headers=extra_headers
+        default_headers=extra_headers,
+        http_client=http_client
     )
 
-    vector_db_id = os.getenv("VECTOR_DB_ID", "my_documents")
-    models = llama_stack_client.models.list()
-    first_model = next(m.identifier for m in models if m.model_type == "llm")
-    model = os.getenv("DEFAULT_LLM_MODEL", first_model)
+    vector_db_id = get_vector_db_id()
+    # Only query the server for models when no default model is configured
+    model = os.getenv("DEFAULT_LLM_MODEL")
+    if model is None:
+        model = _pick_default_model(llama_stack_client)
 
     # Log configuration summary
     logger.info(f"Configuration: URL={llama_stack_url}, Model={model}")
@@ -123,6 +236,25 @@ def initialize_client() -> Tuple[LlamaStackClient, str, str, str]:
     return llama_stack_client, model, vector_db_id, llama_stack_url
 
 
+def get_client() -> LlamaStackClient:
+    """Return the shared Llama Stack client, initializing it on first use"""
+    return initialize_client()[0]
+
+
+def get_model() -> str:
+    """Return the configured LLM model, initializing the client on first use"""
+    return initialize_client()[1]
+
+
+def warm_up_client() -> None:
+    """Initialize the Llama Stack client in the background while the UI starts"""
+    try:
+        initialize_client()
+    except Exception as e:
+        # Requests will retry the initialization and report the error to the user
+        get_logger("main").warning(f"Llama Stack client warm-up failed: {str(e)}")
+
+
 # ============================================================================
 # APPLICATION CREATION AND ORCHESTRATION
 # ============================================================================
@@ -136,15 +268,16 @@ def create_app():
     logger.info("STARTING INTELLIGENT CD CHATBOT")
     logger.info("=" * 60)
     
-    # Initialize Llama Stack client and get configuration
-    client, model, vector_db_id, llama_stack_url = initialize_client()
+    # Llama Stack configuration that does not need a connection
+    vector_db_id = get_vector_db_id()
+    llama_stack_url = get_llama_stack_url()
     
-    # Initialize all tab components
+    # Initialize all tab components; they resolve the client lazily on first use
     logger.info("Initializing tab components...")
-    chat_tab = ChatTab(client, model=model, vector_db_id=vector_db_id)
-    mcp_test_tab = MCPTestTab(client)
-    rag_test_tab = RAGTestTab(client, vector_db_id)
-    system_status_tab = SystemStatusTab(client, llama_stack_url, model=model, vector_db_id=vector_db_id)
+    chat_tab = ChatTab(get_client, model_factory=get_model, vector_db_id=vector_db_id)
+    mcp_test_tab = MCPTestTab(get_client)
+    rag_test_tab = RAGTestTab(get_client, vector_db_id)
+    system_status_tab = SystemStatusTab(get_client, llama_stack_url, model_factory=get_model, vector_db_id=vector_db_id)
     
     logger.info("✅ All components initialized successfully")
     
@@ -163,6 +296,15 @@ def main():
     # Create the demo application
     demo = create_app()
     
+    # Connect to Llama Stack in the background so the UI can bind its port right away
+    threading.Thread(target=warm_up_client, daemon=True).start()
+    
+    # Debug mode and tracebacks in the UI are opt-in for development
+    debug = os.getenv("GRADIO_DEBUG", "0") == "1"
+    
+    # Bound the queue so clients see backpressure instead of silently waiting
+    demo.queue(default_concurrency_limit=QUEUE_CONCURRENCY_LIMIT, max_size=32)
+    
     # Launch the app
     logger.info("🚀Launching Gradio application...")
     
@@ -170,8 +312,11 @@ def main():
         server_name="0.0.0.0",
         server_port=7860,
         share=False,
-        debug=True,
-        show_error=True
+        debug=debug,
+        show_error=debug,
+        max_threads=40,
+        max_file_size="10mb",
+        app_kwargs={"middleware": get_app_middleware()}
     )
 
 if __name__ == "__main__":
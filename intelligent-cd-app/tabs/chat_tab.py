@@ -5,14 +5,43 @@ This module handles the main chat interface with LLM using ReAct methodology.
 """
 
 import os
-import json
-from typing import List, Dict
+import time
+import logging
+import threading
+import orjson
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List
+from gradio import ChatMessage
 from llama_stack_client import LlamaStackClient
 from llama_stack_client.lib.agents.react.agent import ReActAgent
 from llama_stack_client.lib.agents.react.tool_parser import ReActOutput
-from utils import get_logger
+from utils import SEPARATOR, get_logger, list_tools
 
 
+# Minimum interval between streamed chat updates, roughly one animation frame
+STREAM_UPDATE_INTERVAL = 0.016
+
+# JSON schema of the ReAct response format, generated once from the pydantic model
+REACT_OUTPUT_SCHEMA = ReActOutput.model_json_schema()
+
+# Title of the thinking step that carries the agent answer
+RESULT_STEP_TITLE = "📋 Result"
+
+
+def _parse_toolgroups_denylist(denylist_str: str) -> frozenset:
+    """Parse the TOOLGROUPS_DENYLIST JSON array into a set of toolgroup IDs"""
+    if not denylist_str:
+        return frozenset()
+    try:
+        return frozenset(orjson.loads(denylist_str))
+    except (orjson.JSONDecodeError, TypeError):
+        get_logger("chat").warning(f"Invalid TOOLGROUPS_DENYLIST format: {denylist_str}")
+        return frozenset()
+
+
+# Toolgroups hidden from the agent, parsed once at import
+TOOLGROUPS_DENYLIST = _parse_toolgroups_denylist(os.getenv("TOOLGROUPS_DENYLIST", ""))
+
 # Model prompt template
 MODEL_PROMPT = """<|begin_of_text|><|header_start|>system<|header_end|>
 
@@ -70,79 +99,105 @@ When a user reports application issues (API failures, database problems, perform
 You're connected to a real cluster - use the tools to get real information.<|eot|><|header_start|>user<|header_end|>"""
 
 
+@lru_cache(maxsize=None)
+def build_agent_tools_and_prompt(client: LlamaStackClient, vector_db_id: str) -> tuple[list, str]:
+    """Get available tools filtered by the denylist and format the system prompt with them
+    
+    The toolgroups are stable per deployment, so the result is cached per configuration.
+    """
+    logger = get_logger("chat")
+    
+    _, tools_by_toolgroup = list_tools(client)
+    tool_groups = list(tools_by_toolgroup)
+    
+    # Filter out denylisted toolgroups
+    filtered_tool_groups = [tg for tg in tool_groups if tg not in TOOLGROUPS_DENYLIST]
+
+    # Always add the RAG tool configuration as a dictionary to the filtered_tool_groups list
+    # https://llama-stack.readthedocs.io/en/latest/building_applications/rag.html
+    filtered_tool_groups.append({"name": "builtin::rag", "args": {"vector_db_ids":  [vector_db_id], "top_k": 5}})
+    
+    logger.info(f"Filtered tool groups: {filtered_tool_groups}")
+    if TOOLGROUPS_DENYLIST:
+        logger.info(f"Tools: {len(filtered_tool_groups)}/{len(tool_groups)} available (filtered)")
+    else:
+        logger.info(f"Tools: {len(tool_groups)} available (no filtering)")
+    
+    # List only the toolgroup names, sorted, so the system prompt stays short and byte-identical
+    # across restarts; the RAG arguments are passed to the agent, not described to the model
+    tool_group_names = ", ".join(sorted(tg if isinstance(tg, str) else tg["name"] for tg in filtered_tool_groups))
+    formatted_prompt = MODEL_PROMPT.format(tool_groups=tool_group_names)
+    
+    return filtered_tool_groups, formatted_prompt
+
+
 class ChatTab:
     """Handles chat functionality with Llama Stack LLM"""
     
-    def __init__(self, client: LlamaStackClient, model: str, vector_db_id: str):
-        self.client = client
-        self.model = model
+    def __init__(self, client_factory: Callable[[], LlamaStackClient], model_factory: Callable[[], str], vector_db_id: str):
+        self.client_factory = client_factory
+        self.model_factory = model_factory
         self.vector_db_id = vector_db_id
         self.logger = get_logger("chat")
         self.sampling_params = {"temperature": 0.1, "max_tokens": 4096, "max_new_tokens": 4096, "strategy": {"type": "greedy"} }
 
-        # Initialize available tools once during initialization
-        self.tools_array = self._get_available_tools()
+        # Tools, prompt, agent and session are created on the first chat request
+        self.tools_array = None
+        self.formatted_prompt = None
+        self.agent = None
+        self.session_id = None
+        self._agent_lock = threading.Lock()
+    
+    @property
+    def client(self) -> LlamaStackClient:
+        """Llama Stack client, resolved lazily from the factory"""
+        return self.client_factory()
+    
+    @property
+    def model(self) -> str:
+        """LLM model, resolved lazily from the factory"""
+        return self.model_factory()
+    
+    def _get_agent(self) -> tuple[ReActAgent, str]:
+        """Return the agent and session for the entire chat, creating them on first use"""
+        with self._agent_lock:
+            if self.agent is None:
+                # Initialize available tools and the system prompt once per configuration
+                self.tools_array, self.formatted_prompt = build_agent_tools_and_prompt(
+                    self.client, self.vector_db_id
+                )
+                
+                # Initialize agent and session for the entire chat
+                self.agent, self.session_id = self._initialize_agent()
         
-        # Initialize agent and session for the entire chat
-        self.agent, self.session_id = self._initialize_agent()
+        return self.agent, self.session_id
    
-    def _get_available_tools(self) -> list:
-        """Get available tools and filter based on denylist configuration"""
-        tools = self.client.tools.list()
-        tool_groups = list(set(tool.toolgroup_id for tool in tools))
-        
-        # Get denylist from environment variable
-        denylist_str = os.getenv("TOOLGROUPS_DENYLIST", "")
-        denylist = []
-        if denylist_str:
-            try:
-                import json
-                denylist = json.loads(denylist_str)
-            except json.JSONDecodeError:
-                self.logger.warning(f"Invalid TOOLGROUPS_DENYLIST format: {denylist_str}")
-        
-        # Filter out denylisted toolgroups
-        filtered_tool_groups = [tg for tg in tool_groups if tg not in denylist]
-
-        # Always add the RAG tool configuration as a dictionary to the filtered_tool_groups list
-        # https://llama-stack.readthedocs.io/en/latest/building_applications/rag.html
-        filtered_tool_groups.append({"name": "builtin::rag", "args": {"vector_db_ids":  [self.vector_db_id], "top_k": 5}})
-        
-        self.logger.info(f"Filtered tool groups: {filtered_tool_groups}")
-        if denylist:
-            self.logger.info(f"Tools: {len(filtered_tool_groups)}/{len(tool_groups)} available (filtered)")
-        else:
-            self.logger.info(f"Tools: {len(tool_groups)} available (no filtering)")
-        
-        return filtered_tool_groups
-    
     def _initialize_agent(self) -> tuple[ReActAgent, str]:
         """Initialize agent and session that will be reused for the entire chat"""
-        
-        formatted_prompt = MODEL_PROMPT.format(tool_groups=self.tools_array)
 
-        # Log agent creation details
-        self.logger.info("=" * 60)
-        self.logger.info("CREATING ReActAgent")
-        self.logger.info("=" * 60)
-        self.logger.info(f"Model: {self.model}")
-        self.logger.info(f"Toolgroups available ({len(self.tools_array)}): {self.tools_array}")
-        self.logger.info(f"Sampling params: {self.sampling_params}")
+        # Log agent creation details as a single record
+        self.logger.info("%s", "\n".join([
+            SEPARATOR,
+            "CREATING ReActAgent",
+            SEPARATOR,
+            f"Model: {self.model}",
+            f"Toolgroups available ({len(self.tools_array)}): {self.tools_array}",
+            f"Sampling params: {self.sampling_params}",
+        ]))
 
         agent = ReActAgent(
             client=self.client,
             model=self.model,
-            instructions=formatted_prompt,
+            instructions=self.formatted_prompt,
             tools=self.tools_array,
             tool_config={"tool_choice": "auto"},  # Ensure tools are actually executed
             response_format={
                 "type": "json_schema",
-                "json_schema": ReActOutput.model_json_schema(),
+                "json_schema": REACT_OUTPUT_SCHEMA,
             },
             sampling_params=self.sampling_params
         )
-        
-        self.logger.info("✅ ReActAgent created successfully")
+
 
         # Create session for the agent
         session = agent.create_session(session_name="OCP_Chat_Session")
@@ -153,144 +208,196 @@ class ChatTab:
         else:
             session_id = str(session)
         
-        self.logger.info(f"✅ Session created: {session_id}")
-        self.logger.info("=" * 60)
+        self.logger.info("%s", "\n".join([
+            "✅ ReActAgent created successfully",
+            f"✅ Session created: {session_id}",
+            SEPARATOR,
+        ]))
         return agent, session_id
     
-    def chat_completion(self, message: str, chat_history: List[Dict[str, str]]) -> tuple:
-        """Handle chat with LLM using Agent → Session → Turn structure"""
-        from gradio import ChatMessage
-        
-        # Add user message to history
+    def chat_completion(self, message: str, chat_history: List[Dict[str, str]]) -> Iterator[tuple]:
+        """Handle chat with LLM using Agent → Session → Turn structure, streaming updates to the UI"""
+        # Add user message to history and show it right away
         chat_history.append(ChatMessage(role="user", content=message))
+        yield chat_history, ""
         
-        # Get LLM response using Agent API with thinking steps
-        result, thinking_steps = self._execute_agent_turn_with_thinking(message)
-        
-        # Add thinking steps as collapsible sections
-        if thinking_steps:
-            for i, step in enumerate(thinking_steps):
-                chat_history.append(ChatMessage(
-                    role="assistant", 
-                    content=step["content"],
-                    metadata={"title": step["title"]}
-                ))
-        
-        # Add final assistant response
-        chat_history.append(ChatMessage(role="assistant", content=result))
+        # Stream the agent turn: thinking steps are added as collapsible sections as each
+        # step completes, capping UI updates at one per frame
+        last_update = time.monotonic()
+        pending_update = False
+        for event_type, value in self._stream_agent_turn_with_thinking(message):
+            if event_type == "steps":
+                for step in value:
+                    chat_history.append(ChatMessage(
+                        role="assistant", 
+                        content=step["content"],
+                        metadata={"title": step["title"]}
+                    ))
+                    pending_update = True
+            else:
+                # Add final assistant response
+                chat_history.append(ChatMessage(role="assistant", content=value))
+                pending_update = True
+            
+            now = time.monotonic()
+            if pending_update and now - last_update >= STREAM_UPDATE_INTERVAL:
+                last_update = now
+                pending_update = False
+                yield chat_history, ""
         
-        return chat_history, ""
+        yield chat_history, ""
     
-    def _execute_agent_turn_with_thinking(self, message: str) -> tuple[str, list]:
-        """Execute agent turn and capture thinking steps for display"""
-        import json
-        self.logger.debug(f"Executing agent turn with thinking capture")
+    def _stream_agent_turn_with_thinking(self, message: str) -> Iterator[tuple[str, object]]:
+        """Execute a streaming agent turn and capture thinking steps for display
         
-        thinking_steps = []
+        Yields ("steps", list) for every streamed chunk, with the thinking steps of the
+        agent step that just completed (empty for progress chunks), and one ("final", str)
+        with the final answer once the turn is complete.
+        """
+        self.logger.debug("Executing streaming agent turn with thinking capture")
+        
+        thinking_steps_count = 0
         
         try:
-            response = self.agent.create_turn(
+            agent, session_id = self._get_agent()
+            
+            stream = agent.create_turn(
                 messages=[
                     {
                         "role": "user",
                         "content": message
                     }
                 ],
-                session_id=self.session_id,
-                stream=False,  # Keep non-streaming for now
+                session_id=session_id,
+                stream=True,
             )
             
-            # Debug: Print response structure (keep for logging)
-            self.logger.info(f"Response type: {type(response)}")
-            self.logger.info(f"Response attributes: {dir(response)}")
+            debug_enabled = self.logger.isEnabledFor(logging.DEBUG)
+            step_index = 0
+            turn = None
+            final_answer = None
             
-            # Extract thinking steps from response.steps if available
-            if hasattr(response, 'steps') and response.steps:
-                self.logger.info(f"Found {len(response.steps)} steps")
-                for i, step in enumerate(response.steps):
-                    self.logger.info(f"Step {i}: {type(step)} - {dir(step)}")
-                    
-                    # Parse ReActAgent step structure
-                    step_content = ""
-                    step_title = f"Step {i+1}"
+            for chunk in stream:
+                # The server reports a failed turn as a chunk carrying an error and then ends the stream
+                error = getattr(chunk, 'error', None)
+                if error:
+                    error_message = error.get('message', error) if isinstance(error, dict) else getattr(error, 'message', error)
+                    self.logger.error("Agent turn did not complete: %s", error_message)
+                    yield "final", f"Error: Turn did not complete. {error_message}"
+                    return
+                
+                payload = getattr(getattr(chunk, 'event', None), 'payload', None)
+                event_type = getattr(payload, 'event_type', None)
+                
+                if event_type == "step_complete":
+                    step = payload.step_details
+                    if debug_enabled:
+                        self.logger.debug("Step %d: %s - %s", step_index, type(step), dir(step))
                     
-                    # Check if this is an InferenceStep with api_model_response
-                    if hasattr(step, 'api_model_response') and hasattr(step.api_model_response, 'content'):
-                        try:
-                            # Parse the JSON content from the ReActAgent response
-                            content_json = json.loads(step.api_model_response.content)
-                            
-                            # Extract thought if available
-                            if 'thought' in content_json and content_json['thought']:
-                                step_content = content_json['thought']
-                                step_title = "🧠 Thinking"
-                                thinking_steps.append({
-                                    "title": step_title,
-                                    "content": step_content.strip()
-                                })
-                            
-                            # Extract action if available
-                            if 'action' in content_json and content_json['action']:
-                                action = content_json['action']
-                                if isinstance(action, dict) and 'tool_name' in action:
-                                    action_content = f"Using tool: {action['tool_name']}"
-                                    if 'tool_params' in action and action['tool_params']:
-                                        params_str = ", ".join([f"{p.get('name', 'param')}={p.get('value', '')}" for p in action['tool_params']])
-                                        action_content += f" with parameters: {params_str}"
-                                    
-                                    thinking_steps.append({
-                                        "title": "🔧 Action",
-                                        "content": action_content
-                                    })
-                            
-                            # Extract answer if available (this will be the final response)
-                            if 'answer' in content_json and content_json['answer']:
-                                step_content = content_json['answer']
-                                step_title = "📋 Result"
-                                thinking_steps.append({
-                                    "title": step_title,
-                                    "content": step_content.strip()
-                                })
-                                
-                        except json.JSONDecodeError as e:
-                            self.logger.warning(f"Failed to parse JSON content from step {i}: {e}")
-                            # Fallback to string representation
-                            step_content = str(step.api_model_response.content)
-                            thinking_steps.append({
-                                "title": f"💭 Step {i+1}",
-                                "content": step_content.strip()
-                            })
-                    
-                    # Fallback: try other content attributes
-                    elif hasattr(step, 'content'):
-                        step_content = str(step.content)
-                        thinking_steps.append({
-                            "title": f"💭 Step {i+1}",
-                            "content": step_content.strip()
-                        })
+                    thinking_steps = self._parse_step(step, step_index)
+                    thinking_steps_count += len(thinking_steps)
+                    # Keep the answer of the step so the final message is not parsed again
+                    for thinking_step in thinking_steps:
+                        if thinking_step["title"] == RESULT_STEP_TITLE:
+                            final_answer = thinking_step["content"]
+                    step_index += 1
+                    yield "steps", thinking_steps
+                    continue
+                
+                if event_type == "turn_complete":
+                    turn = payload.turn
+                
+                # Progress chunks let the caller flush throttled updates
+                yield "steps", []
             
             # Get final response content - extract only the answer part
-            final_content = ""
-            if hasattr(response, 'output_message') and hasattr(response.output_message, 'content'):
-                try:
-                    # Try to parse as JSON to extract just the answer
-                    content_json = json.loads(response.output_message.content)
-                    if 'answer' in content_json and content_json['answer']:
-                        final_content = content_json['answer']
-                    else:
-                        final_content = response.output_message.content
-                except json.JSONDecodeError:
-                    # If not JSON, use the content as-is
-                    final_content = response.output_message.content
-            else:
-                final_content = str(response)
+            final_content = final_answer or self._extract_final_content(turn)
             
-            self.logger.info(f"Captured {len(thinking_steps)} thinking steps")
-            self.logger.info(f"Final content length: {len(final_content)} characters")
-            return final_content, thinking_steps
+            self.logger.info(
+                "Found %d steps, captured %d thinking steps, final content length: %d characters",
+                step_index, thinking_steps_count, len(final_content)
+            )
+            yield "final", final_content
             
         except Exception as e:
-            self.logger.error(f"Error in agent turn: {str(e)}")
-            import traceback
-            self.logger.error(f"Traceback: {traceback.format_exc()}")
-            return f"Error: {str(e)}", []
+            self.logger.exception("Error in agent turn: %s", e)
+            yield "final", f"Error: {str(e)}"
+    
+    def _parse_step(self, step, i: int) -> list:
+        """Parse a ReActAgent step into thinking steps for display"""
+        thinking_steps = []
+        
+        # Check if this is an InferenceStep with api_model_response
+        content = getattr(getattr(step, 'api_model_response', None), 'content', None)
+        if content is not None:
+            try:
+                # Parse the JSON content from the ReActAgent response once
+                content_json = orjson.loads(content)
+            except orjson.JSONDecodeError as e:
+                self.logger.warning(f"Failed to parse JSON content from step {i}: {e}")
+                content_json = None
+            
+            # Only a JSON object carries ReAct fields; show anything else as is
+            if not isinstance(content_json, dict):
+                thinking_steps.append({
+                    "title": f"💭 Step {i+1}",
+                    "content": str(content).strip()
+                })
+                return thinking_steps
+            
+            # Sections are shown in ReAct order: thought, action, answer
+            thought = content_json.get('thought')
+            if thought:
+                thinking_steps.append({
+                    "title": "🧠 Thinking",
+                    "content": thought.strip()
+                })
+            
+            action = content_json.get('action')
+            if isinstance(action, dict) and 'tool_name' in action:
+                action_content = f"Using tool: {action['tool_name']}"
+                tool_params = action.get('tool_params')
+                if tool_params:
+                    params_str = ", ".join(f"{p.get('name', 'param')}={p.get('value', '')}" for p in tool_params)
+                    action_content += f" with parameters: {params_str}"
+                
+                thinking_steps.append({
+                    "title": "🔧 Action",
+                    "content": action_content
+                })
+            
+            answer = content_json.get('answer')
+            if answer:
+                # This will be the final response
+                thinking_steps.append({
+                    "title": RESULT_STEP_TITLE,
+                    "content": answer.strip()
+                })
+        
+        # Fallback: try other content attributes
+        elif hasattr(step, 'content'):
+            thinking_steps.append({
+                "title": f"💭 Step {i+1}",
+                "content": str(step.content).strip()
+            })
+        
+        return thinking_steps
+    
+    def _extract_final_content(self, turn) -> str:
+        """Extract only the answer part of the final message of a completed turn"""
+        if turn is None:
+            return "❌ The agent turn finished without a response"
+        
+        if hasattr(turn, 'output_message') and hasattr(turn.output_message, 'content'):
+            try:
+                # Try to parse as JSON to extract just the answer
+                content_json = orjson.loads(turn.output_message.content)
+            except orjson.JSONDecodeError:
+                # If not JSON, use the content as-is
+                return turn.output_message.content
+            # Only a JSON object carries a ReAct answer; use anything else as is
+            if isinstance(content_json, dict) and content_json.get('answer'):
+                return content_json['answer']
+            return turn.output_message.content
+        
+        return str(turn)
@@ -4,32 +4,81 @@ MCP Test tab functionality for Intelligent CD Chatbot.
 This module handles MCP server testing functionality with Llama Stack.
 """
 
-import json
+import orjson
 import gradio as gr
+from typing import Callable, Dict, Iterator
 from llama_stack_client import LlamaStackClient
-from utils import get_logger
+from utils import get_logger, list_tools
 
 
 class MCPTestTab:
     """Handles MCP testing functionality with Llama Stack"""
     
-    def __init__(self, client: LlamaStackClient):
-        self.client = client
+    def __init__(self, client_factory: Callable[[], LlamaStackClient]):
+        self.client_factory = client_factory
         self.logger = get_logger("mcp")
+        # (tools_by_toolgroup, methods_by_toolgroup) for the last tools listing the index was built from
+        self._methods_index = None
+    
+    @property
+    def client(self) -> LlamaStackClient:
+        """Llama Stack client, resolved lazily from the factory"""
+        return self.client_factory()
+    
+    def get_connection_status(self) -> str:
+        """Wait for the Llama Stack client to be initialized and report it in the status bar"""
+        try:
+            self.client
+        except Exception as e:
+            self.logger.error(f"Llama Stack client initialization failed: {str(e)}")
+            return f"❌ Failed to connect to Llama Stack: {str(e)}"
+        return "✅ Ready to test MCP server"
     
     def list_toolgroups(self) -> gr.update:
         """List available MCP toolgroups through Llama Stack"""
         self.logger.debug("Attempting to list MCP toolgroups through Llama Stack...")
         
-        # Use the shared client to get tools (which contain toolgroups)
-        tools = self.client.tools.list()
+        # This is the refresh entry point: bypass the tools cache and query Llama Stack
+        _, tools_by_toolgroup = list_tools(self.client, refresh=True)
         
-        # Extract unique toolgroup IDs from tools
-        toolgroups = list(set(tool.toolgroup_id for tool in tools))
+        # Tools are grouped by toolgroup ID once when they are listed
+        toolgroups = list(tools_by_toolgroup)
         self.logger.info(f"Found {len(toolgroups)} toolgroups: {toolgroups}")
         
         return gr.update(choices=toolgroups, value=None)
     
+    def _get_methods_by_toolgroup(self) -> Dict[str, list]:
+        """Return the method names of every toolgroup, indexed once per tools listing"""
+        # Reuse the tools cached by the last toolgroup listing
+        _, tools_by_toolgroup = list_tools(self.client)
+        
+        index = self._methods_index
+        if index is None or index[0] is not tools_by_toolgroup:
+            index = (tools_by_toolgroup, {
+                toolgroup_id: self._extract_method_names(tools)
+                for toolgroup_id, tools in tools_by_toolgroup.items()
+            })
+            self._methods_index = index
+        return index[1]
+    
+    @staticmethod
+    def _extract_method_names(tools: list) -> list:
+        """Extract the individual method names of the tools of a toolgroup"""
+        methods = []
+        for tool in tools:
+            # Check if this tool has individual tools/methods
+            individual_tools = getattr(tool, 'tools', None)
+            if individual_tools:
+                # Tool contains individual methods
+                for individual_tool in individual_tools:
+                    method_name = getattr(individual_tool, 'name', None) or getattr(individual_tool, 'identifier', 'Unknown')
+                    methods.append(method_name)
+            else:
+                # This is a direct tool
+                method_name = getattr(tool, 'name', None) or getattr(tool, 'identifier', 'Unknown')
+                methods.append(method_name)
+        return methods
+    
     def get_toolgroup_methods(self, toolgroup_name: str) -> tuple[str, gr.update]:
         """Get methods for a specific toolgroup through Llama Stack"""
         if not toolgroup_name:
@@ -40,23 +89,7 @@ class MCPTestTab:
         
         self.logger.debug(f"Getting methods for toolgroup: {toolgroup_name}")
         
-        # Use the shared client to get tools for the specific toolgroup
-        tools = self.client.tools.list()
-        
-        # Filter tools by toolgroup and extract individual tools
-        methods = []
-        for tool in tools:
-            if hasattr(tool, 'toolgroup_id') and tool.toolgroup_id == toolgroup_name:
-                # Check if this tool has individual tools/methods
-                if hasattr(tool, 'tools') and tool.tools:
-                    # Tool contains individual methods
-                    for individual_tool in tool.tools:
-                        method_name = getattr(individual_tool, 'name', getattr(individual_tool, 'identifier', 'Unknown'))
-                        methods.append(method_name)
-                else:
-                    # This is a direct tool
-                    method_name = getattr(tool, 'name', getattr(tool, 'identifier', 'Unknown'))
-                    methods.append(method_name)
+        methods = self._get_methods_by_toolgroup().get(toolgroup_name, [])
         
         self.logger.info(f"Found {len(methods)} methods: {methods}")
         
@@ -65,7 +98,33 @@ class MCPTestTab:
         
         return status_text, gr.update(choices=methods, value=None)
     
-    def execute_tool(self, toolgroup_name: str, method_name: str, params_json: str) -> str:
+    @staticmethod
+    def _extract_result_data(result) -> object:
+        """Extract the result data from a ToolInvocationResult or a similar result object"""
+        content = getattr(result, 'content', None)
+        if content:
+            if not isinstance(content, list):
+                return str(content)
+            # Extract text from TextContentItem objects
+            return '\n'.join([getattr(item, 'text', None) or str(item) for item in content])
+        
+        try:
+            return result.text
+        except AttributeError:
+            pass
+        try:
+            return result.data
+        except AttributeError:
+            # Fallback: convert to string representation
+            return str(result)
+    
+    def execute_tool(self, toolgroup_name: str, method_name: str, params_json: str) -> Iterator[str]:
+        """Execute an MCP tool, showing a placeholder in the content area while it runs"""
+        if toolgroup_name and method_name:
+            yield f"⏳ Executing method '{method_name}' from toolgroup '{toolgroup_name}'..."
+        yield self._invoke_tool(toolgroup_name, method_name, params_json)
+    
+    def _invoke_tool(self, toolgroup_name: str, method_name: str, params_json: str) -> str:
         """Execute an MCP tool through Llama Stack using toolgroup and method"""
         if not toolgroup_name:
             return "❌ Please select a toolgroup first"
@@ -76,8 +135,8 @@ class MCPTestTab:
         try:
             # Parse parameters
             try:
-                params = json.loads(params_json) if params_json.strip() else {}
-            except json.JSONDecodeError:
+                params = orjson.loads(params_json) if params_json.strip() else {}
+            except orjson.JSONDecodeError:
                 return "❌ Invalid JSON parameters. Please check your input."
             
             # Execute tool through Llama Stack using tool_runtime
@@ -91,30 +150,11 @@ class MCPTestTab:
                 self.logger.debug(f"Result: {result}")
                 # Extract the actual result data from ToolInvocationResult
                 try:
-                    # Handle ToolInvocationResult structure
-                    if hasattr(result, 'content') and result.content:
-                        # Extract text from TextContentItem objects
-                        if isinstance(result.content, list):
-                            text_parts = []
-                            for item in result.content:
-                                if hasattr(item, 'text'):
-                                    text_parts.append(item.text)
-                                else:
-                                    text_parts.append(str(item))
-                            result_data = '\n'.join(text_parts)
-                        else:
-                            result_data = str(result.content)
-                    elif hasattr(result, 'text'):
-                        result_data = result.text
-                    elif hasattr(result, 'data'):
-                        result_data = result.data
-                    else:
-                        # Fallback: convert to string representation
-                        result_data = str(result)
+                    result_data = self._extract_result_data(result)
                     
                     # Try to format as JSON if it's a dict/list, otherwise use string
                     if isinstance(result_data, (dict, list)):
-                        formatted_result = json.dumps(result_data, indent=2)
+                        formatted_result = orjson.dumps(result_data, option=orjson.OPT_INDENT_2).decode()
                     else:
                         formatted_result = str(result_data)
                         
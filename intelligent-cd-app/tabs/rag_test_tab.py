@@ -4,24 +4,89 @@ RAG Test tab functionality for Intelligent CD Chatbot.
 This module handles RAG testing functionality and status reporting.
 """
 
-import json
-from llama_stack_client import LlamaStackClient
-from utils import get_logger
+import io
+import orjson
+import time
+import threading
+import traceback
+from collections import OrderedDict
+from typing import Callable
+from llama_stack_client import APIConnectionError, LlamaStackClient
+from utils import HEALTHCHECK_TIMEOUT_SECONDS, SEPARATOR, get_logger
+
+
+# Chunks sampled from the vector DB to discover which documents it contains
+DOCUMENT_SAMPLE_MAX_CHUNKS = 50
+# Seconds the document listing is reused between RAG status requests
+DOCUMENTS_CACHE_TTL_SECONDS = 30
+# Seconds a RAG status report is reused when the button is clicked repeatedly
+STATUS_CACHE_TTL_SECONDS = 5
+# Successful test queries are reused for a minute, keeping the most recently used ones
+QUERY_CACHE_TTL_SECONDS = 60
+QUERY_CACHE_MAX_ENTRIES = 64
 
 
 class RAGTestTab:
     """Handles RAG testing functionality"""
     
-    def __init__(self, client: LlamaStackClient, vector_db_id: str):
-        self.client = client
+    def __init__(self, client_factory: Callable[[], LlamaStackClient], vector_db_id: str):
+        self.client_factory = client_factory
         self.logger = get_logger("rag")
         self.vector_db_id = vector_db_id
+        # Cached (expires_at, document_titles) from the last document listing
+        self._documents_cache = None
+        # Cached (expires_at, report) from the last RAG status request
+        self._status_cache = None
+        # query -> (expires_at, report) for recent successful test queries, least recently used first
+        self._query_cache = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+    
+    @property
+    def client(self) -> LlamaStackClient:
+        """Llama Stack client, resolved lazily from the factory"""
+        return self.client_factory()
+    
+    def _list_document_titles(self) -> list[str]:
+        """List the titles of the documents in the configured vector DB
+        
+        Titles come from the metadata attached to each chunk at ingestion time, falling
+        back to the document ID. The listing is cached for DOCUMENTS_CACHE_TTL_SECONDS.
+        """
+        now = time.monotonic()
+        if self._documents_cache and self._documents_cache[0] > now:
+            return self._documents_cache[1]
+        
+        response = self.client.vector_io.query(
+            vector_db_id=self.vector_db_id,
+            query="What documents are available?",
+            params={"max_chunks": DOCUMENT_SAMPLE_MAX_CHUNKS},
+        )
+        
+        # Deduplicate while keeping the order in which the titles were retrieved
+        titles: dict[str, None] = {}
+        for chunk in response.chunks:
+            metadata = chunk.metadata or {}
+            title = metadata.get("title") or metadata.get("document_id")
+            if title:
+                titles.setdefault(title, None)
+        document_titles = list(titles)
+        
+        self._documents_cache = (now + DOCUMENTS_CACHE_TTL_SECONDS, document_titles)
+        return document_titles
 
     def test_rag(self, query: str) -> str:
         """Test RAG functionality and report status in a user-friendly way"""
 
         self.logger.info(f"RAG Query:\n\n{query}")
 
+        now = time.monotonic()
+        with self._query_cache_lock:
+            cached = self._query_cache.get(query)
+            if cached and cached[0] > now:
+                self._query_cache.move_to_end(query)
+                self.logger.debug("RAG Query served from cache")
+                return cached[1]
+
         try:
             # Query documents
             result = self.client.tool_runtime.rag_tool.query(
@@ -32,205 +97,189 @@ class RAGTestTab:
 
             # Try to format the result nicely for the user
             if isinstance(result, (dict, list)):
-                formatted_result = json.dumps(result, indent=2)
+                formatted_result = orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()
             else:
                 formatted_result = str(result)
 
-            return (
+            report = (
                 f"✅ RAG Query executed successfully!\n\n"
                 f"**Query:**\n{query}\n\n"
                 f"**Result:**\n```\n{formatted_result}\n```"
             )
         except Exception as e:
-            import traceback
-            tb = traceback.format_exc()
-            self.logger.error(f"RAG Query failed: {str(e)}\n{tb}")
+            self.logger.exception("RAG Query failed: %s", e)
             return (
                 f"❌ RAG Query failed!\n\n"
                 f"**Query:**\n{query}\n\n"
-                f"**Error:**\n{str(e)}\n\n"
-                f"**Traceback:**\n```\n{tb}\n```"
+                f"**Error:**\n{str(e)}"
             )
+        
+        with self._query_cache_lock:
+            self._query_cache[query] = (now + QUERY_CACHE_TTL_SECONDS, report)
+            self._query_cache.move_to_end(query)
+            while len(self._query_cache) > QUERY_CACHE_MAX_ENTRIES:
+                self._query_cache.popitem(last=False)
+        return report
 
     def get_rag_status(self) -> str:
-        """Get detailed RAG status information including providers, databases, and documents"""
+        """Get detailed RAG status information, reusing a report built in the last few seconds"""
+        now = time.monotonic()
+        if self._status_cache and self._status_cache[0] > now:
+            return self._status_cache[1]
+        
+        report = self._build_rag_status()
+        self._status_cache = (now + STATUS_CACHE_TTL_SECONDS, report)
+        return report
+    
+    def _build_rag_status(self) -> str:
+        """Build detailed RAG status information including providers, databases, and documents"""
         
         self.logger.info("Getting detailed RAG status information...")
         
-        status_info = []
-        status_info.append("=" * 60)
-        status_info.append("📚 RAG STATUS REPORT")
-        status_info.append("=" * 60)
-        status_info.append("")
+        buf = io.StringIO()
+        buf.write(SEPARATOR + "\n")
+        buf.write("📚 RAG STATUS REPORT\n")
+        buf.write(SEPARATOR + "\n")
+        buf.write("\n")
         
         try:
             # 1. List all available vector databases (summary only)
-            status_info.append("🗄️ **Vector Databases:**")
+            buf.write("🗄️ **Vector Databases:**\n")
+            # Listed once and reused by the sections below
+            vector_dbs = None
             try:
                 vector_dbs = self.client.vector_dbs.list()
                 if vector_dbs:
+                    configured_id = self.vector_db_id
+                    configured_marker = " ✅ (Currently configured)"
                     for db_item in vector_dbs:
                         if hasattr(db_item, 'identifier'):
                             db_id = db_item.identifier
-                            current_marker = " ✅ (Currently configured)" if db_id == self.vector_db_id else ""
-                            status_info.append(f"   • {db_id}{current_marker}")
+                            current_marker = configured_marker if db_id == configured_id else ""
+                            buf.write(f"   • {db_id}{current_marker}\n")
                         else:
-                            status_info.append(f"   • {str(db_item)}")
+                            buf.write(f"   • {str(db_item)}\n")
                 else:
-                    status_info.append("   • No vector databases found")
+                    buf.write("   • No vector databases found\n")
             except Exception as e:
-                status_info.append(f"   ❌ Error listing vector databases: {str(e)}")
+                buf.write(f"   ❌ Error listing vector databases: {str(e)}\n")
             
-            status_info.append("")
+            buf.write("\n")
             
             # 2. Get detailed information about the configured vector database
             if self.vector_db_id:
-                status_info.append(f"🔍 **Detailed Information for '{self.vector_db_id}':**")
+                buf.write(f"🔍 **Detailed Information for '{self.vector_db_id}':**\n")
                 
-                # Try to get database info using the correct API
+                # Take the database info from the listing, retrieving it only if the listing failed
                 try:
-                    db_info = self.client.vector_dbs.retrieve(self.vector_db_id)
+                    if vector_dbs is not None:
+                        db_info = next((db for db in vector_dbs if getattr(db, 'identifier', None) == self.vector_db_id), None)
+                    else:
+                        db_info = self.client.vector_dbs.retrieve(self.vector_db_id)
                     if db_info:
-                        if hasattr(db_info, '__dict__'):
-                            for key, value in db_info.__dict__.items():
-                                if not key.startswith('_') and value is not None:
-                                    status_info.append(f"   • {key.replace('_', ' ').title()}: {value}")
+                        try:
+                            db_fields = vars(db_info)
+                        except TypeError:
+                            db_fields = None
+                        if db_fields is not None:
+                            buf.write("".join(
+                                f"   • {key.replace('_', ' ').title()}: {value}\n"
+                                for key, value in db_fields.items()
+                                if not key.startswith('_') and value is not None
+                            ))
                         else:
-                            status_info.append(f"   • Database Info: {str(db_info)}")
+                            buf.write(f"   • Database Info: {str(db_info)}\n")
                     else:
-                        status_info.append("   • No detailed database information available")
+                        buf.write("   • No detailed database information available\n")
                 except Exception as e:
-                    status_info.append(f"   ❌ Error getting database info: {str(e)}")
+                    buf.write(f"   ❌ Error getting database info: {str(e)}\n")
                 
-                status_info.append("")
+                buf.write("\n")
                 
                 # 3. Get document information with count and truncated titles
-                status_info.append(f"📄 **Documents in '{self.vector_db_id}':**")
+                buf.write(f"📄 **Documents in '{self.vector_db_id}':**\n")
                 try:
-                    # Try to get document information through queries
-                    document_titles = []
-                    document_count = 0
-                    
-                    # Try different queries to extract document information
-                    test_queries = [
-                        "What documents are available?",
-                        "List all document titles",
-                        "What files or documents are stored?",
-                        "Show me the document names"
-                    ]
-                    
-                    for query in test_queries:
-                        try:
-                            result = self.client.tool_runtime.rag_tool.query(
-                                vector_db_ids=[self.vector_db_id],
-                                content=query,
-                            )
-                            if result:
-                                result_str = str(result).lower()
-                                # Look for document-related information in the response
-                                if any(keyword in result_str for keyword in ['document', 'file', 'title', 'name']):
-                                    # Try to extract titles from the response
-                                    lines = str(result).split('\n')
-                                    for line in lines:
-                                        line = line.strip()
-                                        if line and len(line) > 5 and len(line) < 100:
-                                            # Simple heuristic to identify potential document titles
-                                            if any(keyword in line.lower() for keyword in ['document', 'file', '.pdf', '.txt', '.doc', 'title']):
-                                                if line not in document_titles:
-                                                    document_titles.append(line)
-                                    break
-                        except Exception:
-                            continue
-                    
-                    # If we couldn't extract titles, try a more generic approach
-                    if not document_titles:
-                        try:
-                            # Try to get a sample of content to estimate document count
-                            sample_result = self.client.tool_runtime.rag_tool.query(
-                                vector_db_ids=[self.vector_db_id],
-                                content="sample content",
-                            )
-                            if sample_result:
-                                # Estimate based on response length and structure
-                                result_str = str(sample_result)
-                                if len(result_str) > 1000:
-                                    document_count = "Multiple documents detected"
-                                else:
-                                    document_count = "Documents available"
-                        except Exception:
-                            pass
+                    # List document titles from the chunk metadata of a single vector DB query
+                    try:
+                        document_titles = self._list_document_titles()
+                    except Exception as e:
+                        self.logger.warning(f"Could not list documents from vector DB chunks: {str(e)}")
+                        document_titles = []
                     
                     # Display results
                     if document_titles:
-                        status_info.append(f"   • Document Count: {len(document_titles)} documents found")
-                        status_info.append("   • Document Titles (truncated):")
-                        for i, title in enumerate(document_titles[:5]):  # Show max 5 titles
-                            truncated_title = title[:60] + "..." if len(title) > 60 else title
-                            status_info.append(f"     {i+1}. {truncated_title}")
+                        buf.write(f"   • Document Count: {len(document_titles)} documents found\n")
+                        buf.write("   • Document Titles (truncated):\n")
+                        # Show max 5 titles
+                        buf.write("".join(
+                            f"     {i}. {title[:60] + '...' if len(title) > 60 else title}\n"
+                            for i, title in enumerate(document_titles[:5], 1)
+                        ))
                         if len(document_titles) > 5:
-                            status_info.append(f"     ... and {len(document_titles) - 5} more documents")
-                    elif document_count:
-                        status_info.append(f"   • Document Status: {document_count}")
+                            buf.write(f"     ... and {len(document_titles) - 5} more documents\n")
                     else:
-                        status_info.append("   • Document information not available through queries")
-                        status_info.append("   • System is responsive to queries")
+                        buf.write("   • Document information not available through queries\n")
+                        buf.write("   • Document content sampling skipped (use a test query to inspect it)\n")
                         
                 except Exception as e:
-                    status_info.append(f"   ❌ Error accessing document information: {str(e)}")
+                    buf.write(f"   ❌ Error accessing document information: {str(e)}\n")
                 
-                status_info.append("")
+                buf.write("\n")
                 
                 # 4. Provider information (extracted from vector databases)
-                status_info.append("🔧 **Provider Information:**")
+                buf.write("🔧 **Provider Information:**\n")
                 try:
-                    vector_dbs = self.client.vector_dbs.list()
-                    providers_found = set()
-                    for db_item in vector_dbs:
-                        if hasattr(db_item, 'provider_id'):
-                            providers_found.add(db_item.provider_id)
+                    if vector_dbs is None:
+                        vector_dbs = self.client.vector_dbs.list()
+                    providers_found = {
+                        db_item.provider_id for db_item in vector_dbs
+                        if getattr(db_item, 'provider_id', None) is not None
+                    }
                     
                     if providers_found:
-                        status_info.append("   • Configured Providers:")
+                        buf.write("   • Configured Providers:\n")
                         for provider in providers_found:
-                            status_info.append(f"     • {provider}")
+                            buf.write(f"     • {provider}\n")
                     else:
-                        status_info.append("   • No provider information available")
+                        buf.write("   • No provider information available\n")
                         
                 except Exception as e:
-                    status_info.append(f"   ❌ Error getting provider info: {str(e)}")
+                    buf.write(f"   ❌ Error getting provider info: {str(e)}\n")
                 
-                status_info.append("")
+                buf.write("\n")
                 
                 # 5. Functionality test
-                status_info.append("🧪 **Functionality Test:**")
+                buf.write("🧪 **Functionality Test:**\n")
                 try:
-                    test_result = self.client.tool_runtime.rag_tool.query(
+                    # Probe without retries, so the test is bounded by its timeout
+                    test_result = self.client.with_options(max_retries=0).tool_runtime.rag_tool.query(
                         vector_db_ids=[self.vector_db_id],
                         content="test query",
+                        timeout=HEALTHCHECK_TIMEOUT_SECONDS,
                     )
                     if test_result:
-                        status_info.append("   ✅ RAG query functionality is working")
-                        status_info.append(f"   • Test query returned: {len(str(test_result))} characters")
+                        buf.write("   ✅ RAG query functionality is working\n")
+                        buf.write(f"   • Test query returned: {len(str(test_result))} characters\n")
                     else:
-                        status_info.append("   ⚠️ RAG query returned empty result")
+                        buf.write("   ⚠️ RAG query returned empty result\n")
                 except Exception as e:
-                    status_info.append(f"   ❌ RAG query test failed: {str(e)}")
+                    buf.write(f"   ❌ RAG query test failed: {str(e)}\n")
             
             else:
-                status_info.append("❌ No vector database ID configured")
+                buf.write("❌ No vector database ID configured\n")
             
-            status_info.append("")
-            status_info.append("=" * 60)
+            buf.write("\n")
+            buf.write(SEPARATOR)
             
         except Exception as e:
-            import traceback
-            tb = traceback.format_exc()
-            self.logger.error(f"RAG Status check failed: {str(e)}\n{tb}")
-            status_info.append(f"❌ Error getting RAG status: {str(e)}")
-            status_info.append("")
-            status_info.append("**Traceback:**")
-            status_info.append(f"```\n{tb}\n```")
-            status_info.append("")
-            status_info.append("=" * 60)
+            self.logger.exception("RAG Status check failed: %s", e)
+            buf.write(f"❌ Error getting RAG status: {str(e)}\n")
+            buf.write("\n")
+            # Connection failures are self-explanatory; only unexpected errors get a traceback
+            if not isinstance(e, APIConnectionError):
+                buf.write("**Traceback:**\n")
+                buf.write(f"```\n{traceback.format_exc()}\n```\n")
+                buf.write("\n")
+            buf.write(SEPARATOR)
         
-        return "\n".join(status_info)
+        return buf.getvalue()
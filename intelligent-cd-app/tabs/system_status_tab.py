@@ -4,42 +4,94 @@ System Status tab functionality for Intelligent CD Chatbot.
 This module handles system status monitoring and health checks.
 """
 
-from llama_stack_client import LlamaStackClient
-from utils import get_logger
+import time
+import atexit
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from operator import attrgetter
+from typing import Callable, Iterator, Optional
+from llama_stack_client import APIConnectionError, APITimeoutError, LlamaStackClient
+from utils import HEALTHCHECK_TIMEOUT_SECONDS, QUEUE_CONCURRENCY_LIMIT, SEPARATOR, get_logger, list_tools
+
+
+# Seconds a system status report is reused when the button is clicked repeatedly
+STATUS_CACHE_TTL_SECONDS = 5
+# Component checks run by each status request
+STATUS_CHECKS = 4
 
 
 class SystemStatusTab:
     """Handles system status functionality"""
     
-    def __init__(self, client: LlamaStackClient, llama_stack_url: str, model: str, vector_db_id: str):
-        self.client = client
+    def __init__(self, client_factory: Callable[[], LlamaStackClient], llama_stack_url: str, model_factory: Callable[[], str], vector_db_id: str):
+        self.client_factory = client_factory
         self.llama_stack_url = llama_stack_url
-        self.model = model
+        self.model_factory = model_factory
         self.vector_db_id = vector_db_id
         self.logger = get_logger("system")  
+        # Executor reused across status checks to probe the components concurrently
+        # (one worker per component check for every status request the queue may run at the same time)
+        self._executor = ThreadPoolExecutor(
+            max_workers=STATUS_CHECKS * QUEUE_CONCURRENCY_LIMIT,
+            thread_name_prefix="status"
+        )
+        atexit.register(self._executor.shutdown, wait=False)
+        # Separate executor for the Llama Stack version call that overlaps the health call; its tasks
+        # never wait on another task, so a busy status pool cannot leave the version call unscheduled
+        self._version_executor = ThreadPoolExecutor(
+            max_workers=QUEUE_CONCURRENCY_LIMIT,
+            thread_name_prefix="status-version"
+        )
+        atexit.register(self._version_executor.shutdown, wait=False)
+        # Cached (expires_at, report) from the last system status request
+        self._status_cache = None
+    
+    @property
+    def client(self) -> LlamaStackClient:
+        """Llama Stack client, resolved lazily from the factory"""
+        return self.client_factory()
+    
+    @property
+    def probe_client(self) -> LlamaStackClient:
+        """Llama Stack client for health probes, without retries so each probe is bounded by its timeout"""
+        return self.client.with_options(max_retries=0)
     
-    def get_gradio_status(self) -> str:
+    @property
+    def model(self) -> str:
+        """LLM model, resolved lazily from the factory"""
+        return self.model_factory()
+    
+    def get_gradio_status(self) -> list[str]:
         """Get Gradio application status"""
-        return "✅ Gradio Application: Running and accessible"
+        return ["✅ Gradio Application: Running and accessible"]
     
-    def get_llama_stack_status(self) -> list[str]:
-        """Get Llama Stack server health and version information"""
+    def get_llama_stack_status(self, backend_down: Optional[threading.Event] = None) -> list[str]:
+        """Get Llama Stack server health and version information
+        
+        If the server cannot be reached at the transport level, backend_down is set so the
+        other checks, which go through the same server, can be reported as skipped.
+        """
         llama_stack_status = []
         llama_stack_status.append("🚀 Llama Stack Server:")
         llama_stack_status.append(f"   • URL: {self.llama_stack_url}")
         
         try:
-            # Get version information
-            version_info = self.client.inspect.version()
+            # Get version and health information concurrently; both requests are bounded by their
+            # timeout, so waiting for the version result is bounded too
+            client = self.probe_client
+            version_future = self._version_executor.submit(client.inspect.version, timeout=HEALTHCHECK_TIMEOUT_SECONDS)
+            health_info = client.inspect.health(timeout=HEALTHCHECK_TIMEOUT_SECONDS)
+            version_info = version_future.result()
             llama_stack_status.append(f"   • Version: ✅ {version_info.version}")
-            
-            # Get health information
-            health_info = self.client.inspect.health()
             llama_stack_status.append(f"   • Health: ✅ {health_info.status}")
             
         except Exception as e:
             llama_stack_status.append("   • Status: ❌ Failed to connect to Llama Stack server")
             llama_stack_status.append(f"   • Error: {str(e)}")
+            # A timed out server may be slow rather than down, so only transport failures skip the other checks
+            if backend_down is not None and isinstance(e, APIConnectionError) and not isinstance(e, APITimeoutError):
+                backend_down.set()
         
         return llama_stack_status
     
@@ -50,7 +102,7 @@ class SystemStatusTab:
         
         # Test LLM connectivity with a direct chat.completions.create request
         try:
-            test_response = self.client.chat.completions.create(
+            test_response = self.probe_client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "user", "content": "Hello, this is a test message."}
@@ -58,22 +110,18 @@ class SystemStatusTab:
                 temperature=0.7,
                 max_tokens=100,
                 stream=False,
+                timeout=HEALTHCHECK_TIMEOUT_SECONDS,
             )
             llm_status.append("   • Status: ✅ LLM service responding")
             llm_status.append(f"   • Model: {self.model}")
+            
+            # Report the response length only for a successful completion
+            choices = test_response.choices
+            response_content = (choices[0].message.content if choices else None) or ""
+            llm_status.append(f"   • Response: ✅ Received {len(response_content)} characters")
         except Exception as e:
             llm_status.append("   • Status: ❌ LLM service not responding")
             llm_status.append(f"   • Error: {str(e)}")
-            test_response = None
-        
-        # Extract response content for length calculation
-        if hasattr(test_response, 'messages') and test_response.messages:
-            last_message = test_response.messages[-1]
-            response_content = getattr(last_message, 'content', str(last_message))
-        else:
-            response_content = str(test_response)
-        
-        llm_status.append(f"   • Response: ✅ Received {len(response_content)} characters")
         
         return llm_status
     
@@ -84,7 +132,7 @@ class SystemStatusTab:
         
         # Check 1: Test connection by calling list()
         try:
-            rag_vector_dbs = self.client.vector_dbs.list()
+            rag_vector_dbs = self.probe_client.vector_dbs.list(timeout=HEALTHCHECK_TIMEOUT_SECONDS)
             rag_status.append("   • Connection: ✅ RAG backend responding")
         except Exception as e:
             rag_status.append("   • Connection: ❌ Failed to connect to RAG backend")
@@ -92,7 +140,7 @@ class SystemStatusTab:
             return rag_status
         
         # Check 2: Show if self.vector_db_id is included in the list
-        vector_db_ids = [db.identifier for db in rag_vector_dbs] if rag_vector_dbs else []
+        vector_db_ids = list(map(attrgetter('identifier'), rag_vector_dbs)) if rag_vector_dbs else []
         if self.vector_db_id in vector_db_ids:
             rag_status.append(f"   • Target DB: ✅ Vector DB '{self.vector_db_id}' found in list")
         else:
@@ -114,29 +162,26 @@ class SystemStatusTab:
         mcp_status = []
         mcp_status.append("☸️ MCP Server:")
         
-        # Test MCP connection directly
+        # List tools to check MCP server connectivity, reusing the listing shared with the MCP tab
+        # (the Refresh Toolgroups button forces a new one)
         self.logger.debug("Testing MCP connection directly...")
         try:
-            # Test if we can list tools
-            tools = self.client.tools.list()
+            tools, tools_by_toolgroup = list_tools(self.client, timeout=HEALTHCHECK_TIMEOUT_SECONDS)
             self.logger.info(f"MCP tools.list() returned: {len(tools)} tools")
             
-            # Test if we can invoke a simple tool
-            if tools:
+            if tools and self.logger.isEnabledFor(logging.DEBUG):
                 first_tool = tools[0]
                 self.logger.debug(f"First tool: {first_tool}")
                 if hasattr(first_tool, 'name'):
                     self.logger.debug(f"First tool name: {first_tool.name}")
         except Exception as e:
-            self.logger.error(f"MCP test failed: {str(e)}")
-            import traceback
-            self.logger.error(f"Traceback: {traceback.format_exc()}")
-        
-        # List tools to check MCP server connectivity
-        tools = self.client.tools.list()
+            self.logger.exception("MCP test failed: %s", e)
+            mcp_status.append("   • Status: ❌ MCP server not responding")
+            mcp_status.append(f"   • Error: {str(e)}")
+            return mcp_status
         
-        # Extract unique toolgroup IDs
-        toolgroups = list(set(tool.toolgroup_id for tool in tools))
+        # Unique toolgroup IDs, in the order the tools were listed
+        toolgroups = list(tools_by_toolgroup)
         mcp_status.append("   • Status: ✅ MCP server responding")
         mcp_status.append(f"   • Toolgroups: ✅ Found {len(toolgroups)} toolgroup(s)")
         
@@ -148,26 +193,87 @@ class SystemStatusTab:
         
         return mcp_status
     
-    def get_system_status(self) -> str:
-        """Get comprehensive system status by combining all component statuses"""
-        
-        # Combine all status information
-        full_status = "\n".join([
-            "=" * 60,
-            "🔍 SYSTEM STATUS REPORT",
-            "=" * 60,
-            "",
-            self.get_gradio_status(),
-            "",
-            "\n".join(self.get_llama_stack_status()),
-            "",
-            "\n".join(self.get_llm_status()),
-            "",
-            "\n".join(self.get_rag_status()),
-            "",
-            "\n".join(self.get_mcp_status()),
-            "",
-            "=" * 60
-        ])
-        
-        return full_status
+    def get_system_status(self) -> Iterator[str]:
+        """Stream the comprehensive system status, reusing a report built in the last few seconds"""
+        now = time.monotonic()
+        if self._status_cache and self._status_cache[0] > now:
+            yield self._status_cache[1]
+            return
+        
+        report = None
+        for report in self._stream_system_status():
+            yield report
+        self._status_cache = (now + STATUS_CACHE_TTL_SECONDS, report)
+    
+    def _stream_system_status(self) -> Iterator[str]:
+        """Yield the system status report again every time a component check completes"""
+        
+        # The component checks are network-bound, so run them concurrently
+        backend_down = threading.Event()
+        checks = [
+            ("🚀 Llama Stack Server:", lambda: self.get_llama_stack_status(backend_down)),
+            ("🤖 LLM Service (Inference):", self.get_llm_status),
+            ("📚 RAG Server:", self.get_rag_status),
+            ("☸️ MCP Server:", self.get_mcp_status),
+        ]
+        # Each check's timeout starts when it begins running, not when it is queued
+        started_at = {}
+        
+        def run_check(index, check):
+            started_at[index] = time.monotonic()
+            # A check that starts after Llama Stack was found unreachable skips its network call
+            if backend_down.is_set():
+                return [checks[index][0], "   • Status: ⏭️ Skipped (Llama Stack unreachable)"]
+            return check()
+        
+        futures = {self._executor.submit(run_check, index, check): index for index, (_, check) in enumerate(checks)}
+        
+        # Sections keep the display order while the checks complete in any order
+        sections = [[title, "   • Status: ⏳ Checking..."] for title, _ in checks]
+        yield self._format_system_status(sections)
+        
+        pending = set(futures)
+        while pending:
+            # A check that ran out of time is reported instead of blocking the report
+            now = time.monotonic()
+            expired = [
+                future for future in pending
+                if futures[future] in started_at and now - started_at[futures[future]] >= HEALTHCHECK_TIMEOUT_SECONDS
+            ]
+            for future in expired:
+                pending.discard(future)
+                title = checks[futures[future]][0]
+                self.logger.warning(f"{title} status check timed out after {HEALTHCHECK_TIMEOUT_SECONDS}s")
+                sections[futures[future]] = [title, f"   • Status: ⏱️ Timed out after {HEALTHCHECK_TIMEOUT_SECONDS:g}s"]
+            if not pending:
+                yield self._format_system_status(sections)
+                return
+            
+            # Wake up for the next completion or the earliest deadline of a running check
+            deadlines = [started_at[futures[future]] + HEALTHCHECK_TIMEOUT_SECONDS for future in pending if futures[future] in started_at]
+            wait_timeout = max(min(deadlines) - now, 0) if deadlines else HEALTHCHECK_TIMEOUT_SECONDS
+            done, pending = wait(pending, timeout=wait_timeout, return_when=FIRST_COMPLETED)
+            
+            for future in done:
+                sections[futures[future]] = future.result()
+            
+            # Every component is reached through Llama Stack, so stop waiting for checks still in flight if it is down
+            if backend_down.is_set():
+                for future in pending:
+                    sections[futures[future]] = [checks[futures[future]][0], "   • Status: ⏭️ Not checked (Llama Stack unreachable)"]
+                yield self._format_system_status(sections)
+                return
+            
+            if done:
+                yield self._format_system_status(sections)
+    
+    def _format_system_status(self, sections: list[list[str]]) -> str:
+        """Combine the component statuses into the system status report"""
+        lines = [SEPARATOR, "🔍 SYSTEM STATUS REPORT", SEPARATOR, ""]
+        lines.extend(self.get_gradio_status())
+        for section in sections:
+            lines.append("")
+            lines.extend(section)
+        lines.extend(("", SEPARATOR))
+        
+        return "\n".join(lines)
@@ -6,13 +6,54 @@ main.py and the tab classes without creating circular dependencies.
 """
 
 import os
+import time
+import queue
+import atexit
 import logging
+import logging.handlers
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from operator import attrgetter
+from typing import Dict, Optional, Tuple
 
 
+# Separator line framing the status reports and log banners
+SEPARATOR = "=" * 60
+
+# Log level from environment variable, default to INFO, resolved once at import
+LOG_LEVEL_NAME = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVEL = getattr(logging, LOG_LEVEL_NAME)
+
+
+# Shared queue drained by a single background listener that writes to the console
+_log_queue = None
+_log_listener = None
+
+
+def _start_log_listener(formatter: logging.Formatter) -> queue.Queue:
+    """Start the background console listener once and return its queue"""
+    global _log_queue, _log_listener
+    
+    if _log_queue is None:
+        _log_queue = queue.Queue(-1)
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        _log_listener = logging.handlers.QueueListener(_log_queue, console_handler, respect_handler_level=True)
+        _log_listener.start()
+        # Flush pending records on interpreter shutdown
+        atexit.register(_log_listener.stop)
+    
+    return _log_queue
+
+
+@lru_cache(maxsize=1)
 def setup_logging():
-    """Configure logging with different levels and formatters"""
-    # Get log level from environment variable, default to INFO
-    log_level = os.getenv("LOG_LEVEL", "INFO").upper()
+    """Configure logging with different levels and formatters
+    
+    The configuration is applied once; later calls return the same (level, formatter, queue).
+    """
+    log_level = LOG_LEVEL_NAME
     
     # Create formatter
     formatter = logging.Formatter(
@@ -20,6 +61,9 @@ def setup_logging():
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     
+    # Console output happens on a background thread, off the request path
+    log_queue = _start_log_listener(formatter)
+    
     # Configure third-party loggers to reduce noise
     # Set httpx (HTTP client) to WARNING level to reduce HTTP request logs
     httpx_logger = logging.getLogger("httpx")
@@ -33,16 +77,20 @@ def setup_logging():
     requests_logger = logging.getLogger("requests")
     requests_logger.setLevel(logging.WARNING)
     
-    return log_level, formatter
+    return log_level, formatter, log_queue
 
 
+@lru_cache(maxsize=None)
 def get_logger(name: str):
-    """Get a logger with the specified name and proper configuration"""
+    """Get a logger with the specified name and proper configuration
+    
+    Loggers are cached by name, so the handler wiring runs once per component.
+    """
     # Initialize logging configuration
-    log_level, log_formatter = setup_logging()
+    _, _, log_queue = setup_logging()
     
     logger = logging.getLogger(name)
-    logger.setLevel(getattr(logging, log_level))
+    logger.setLevel(LOG_LEVEL)
     
     # Clear any existing handlers
     logger.handlers.clear()
@@ -50,10 +98,56 @@ def get_logger(name: str):
     # Prevent propagation to root logger to avoid duplicates
     logger.propagate = False
     
-    # Create console handler only
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(getattr(logging, log_level))
-    console_handler.setFormatter(log_formatter)
-    logger.addHandler(console_handler)
+    # Enqueue records only; the listener thread formats and writes them
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setLevel(LOG_LEVEL)
+    logger.addHandler(queue_handler)
     
     return logger
+
+
+# Events processed at the same time by the Gradio queue (its default_concurrency_limit)
+QUEUE_CONCURRENCY_LIMIT = 4
+
+
+# Upper bound in seconds for each health check probe, configurable through HEALTHCHECK_TIMEOUT
+HEALTHCHECK_TIMEOUT_SECONDS = float(os.getenv("HEALTHCHECK_TIMEOUT", "10"))
+
+
+# Seconds a tools.list() result is reused before querying Llama Stack again
+TOOLS_CACHE_TTL_SECONDS = 60
+
+# Cached (expires_at, tools, tools_by_toolgroup) per client
+_tools_cache = {}
+_tools_cache_lock = threading.Lock()
+
+_toolgroup_id = attrgetter("toolgroup_id")
+
+
+def list_tools(client, refresh: bool = False, timeout: Optional[float] = None) -> Tuple[list, Dict[str, list]]:
+    """Return the tools registered in Llama Stack and the same tools grouped by toolgroup ID
+    
+    Results are cached per client for TOOLS_CACHE_TTL_SECONDS; pass refresh=True
+    to bypass the cache and query Llama Stack again. A timeout, if given, bounds the
+    tools.list() request: it replaces the client default and the request is not retried.
+    """
+    now = time.monotonic()
+    if not refresh:
+        with _tools_cache_lock:
+            cached = _tools_cache.get(client)
+        if cached and cached[0] > now:
+            return cached[1], cached[2]
+    
+    if timeout is not None:
+        tools = client.with_options(max_retries=0).tools.list(timeout=timeout)
+    else:
+        tools = client.tools.list()
+    grouped = defaultdict(list)
+    for tool in tools:
+        grouped[_toolgroup_id(tool)].append(tool)
+    tools_by_toolgroup = dict(grouped)
+    
+    with _tools_cache_lock:
+        _tools_cache[client] = (now + TOOLS_CACHE_TTL_SECONDS, tools, tools_by_toolgroup)
+    
+    return tools, tools_by_toolgroup
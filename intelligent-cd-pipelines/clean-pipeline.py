@@ -1,6 +1,22 @@
 from kfp.client import Client
+from concurrent.futures import ThreadPoolExecutor
+import json
 import os
 
+# Deletes within a phase are independent, so they are sent concurrently
+DELETE_MAX_WORKERS = 8
+
+
+def display_name_filter(display_name):
+    """Build a KFP list filter that matches resources by display name on the server."""
+    return json.dumps({
+        "predicates": [{
+            "operation": "EQUALS",
+            "key": "display_name",
+            "string_value": display_name,
+        }]
+    })
+
 def clean_pipeline_components():
     """Remove all pipeline components in reverse order."""
     
@@ -15,51 +31,57 @@ def clean_pipeline_components():
         existing_token=bearer_token
     )
     
-    # 1. Delete runs from experiment
-    print("Deleting pipeline runs...")
-    experiments = kfp_client.list_experiments()
-    if experiments and hasattr(experiments, "experiments"):
-        for exp in experiments.experiments:
-            if exp.display_name == "ingest-experiment":
-                runs = kfp_client.list_runs(experiment_id=exp.experiment_id)
-                if runs and hasattr(runs, "runs"):
-                    for run in runs.runs:
-                        print(f"Deleting run: {run.display_name} (ID: {run.run_id})")
-                        kfp_client.delete_run(run_id=run.run_id)
+    with ThreadPoolExecutor(max_workers=DELETE_MAX_WORKERS) as executor:
+        # 1. Delete runs from experiment
+        print("Deleting pipeline runs...")
+        ingest_experiments = []
+        experiments = kfp_client.list_experiments(filter=display_name_filter("ingest-experiment"))
+        if experiments and hasattr(experiments, "experiments"):
+            ingest_experiments = [exp for exp in experiments.experiments if exp.display_name == "ingest-experiment"]
+        for exp in ingest_experiments:
+            runs = kfp_client.list_runs(experiment_id=exp.experiment_id)
+            if runs and hasattr(runs, "runs"):
+                for run in runs.runs:
+                    print(f"Deleting run: {run.display_name} (ID: {run.run_id})")
+                # Wait for every run to be deleted before deleting the experiment
+                list(executor.map(lambda run: kfp_client.delete_run(run_id=run.run_id), runs.runs))
     
-    # 2. Delete experiment
-    print("Deleting experiment...")
-    experiments = kfp_client.list_experiments()
-    if experiments and hasattr(experiments, "experiments"):
-        for exp in experiments.experiments:
-            if exp.display_name == "ingest-experiment":
-                print(f"Deleting experiment: {exp.display_name} (ID: {exp.experiment_id})")
-                kfp_client.delete_experiment(experiment_id=exp.experiment_id)
+        # 2. Delete experiment (reusing the experiments found above)
+        print("Deleting experiment...")
+        for exp in ingest_experiments:
+            print(f"Deleting experiment: {exp.display_name} (ID: {exp.experiment_id})")
+            kfp_client.delete_experiment(experiment_id=exp.experiment_id)
     
-    # 3. Delete pipeline versions and pipeline
-    print("Deleting pipeline...")
-    pipelines = kfp_client.list_pipelines()
-    if pipelines and hasattr(pipelines, "pipelines"):
-        for pipeline in pipelines.pipelines:
-            if pipeline.display_name == "ingest-pipeline":
-                # Delete all pipeline versions first
-                versions = kfp_client.list_pipeline_versions(pipeline_id=pipeline.pipeline_id)
-                if versions and hasattr(versions, "pipeline_versions"):
-                    for version in versions.pipeline_versions:
-                        print(f"Deleting pipeline version: {version.pipeline_version_id}")
-                        kfp_client.delete_pipeline_version(
-                            pipeline_id=pipeline.pipeline_id, 
-                            pipeline_version_id=version.pipeline_version_id)
+        # 3. Delete pipeline versions and pipeline
+        print("Deleting pipeline...")
+        pipelines = kfp_client.list_pipelines(filter=display_name_filter("ingest-pipeline"))
+        if pipelines and hasattr(pipelines, "pipelines"):
+            for pipeline in pipelines.pipelines:
+                if pipeline.display_name == "ingest-pipeline":
+                    # Delete all pipeline versions first
+                    versions = kfp_client.list_pipeline_versions(pipeline_id=pipeline.pipeline_id)
+                    if versions and hasattr(versions, "pipeline_versions"):
+                        for version in versions.pipeline_versions:
+                            print(f"Deleting pipeline version: {version.pipeline_version_id}")
+                        list(executor.map(
+                            lambda version: kfp_client.delete_pipeline_version(
+                                pipeline_id=pipeline.pipeline_id, 
+                                pipeline_version_id=version.pipeline_version_id),
+                            versions.pipeline_versions))
                 
-                # Delete the pipeline itself
-                print(f"Deleting pipeline: {pipeline.display_name} (ID: {pipeline.pipeline_id})")
-                kfp_client.delete_pipeline(pipeline_id=pipeline.pipeline_id)
+                    # Delete the pipeline itself
+                    print(f"Deleting pipeline: {pipeline.display_name} (ID: {pipeline.pipeline_id})")
+                    kfp_client.delete_pipeline(pipeline_id=pipeline.pipeline_id)
     
     # 4. Clean up local files
     print("Cleaning up local files...")
-    if os.path.exists("ingest-pipeline.yaml"):
-        os.remove("ingest-pipeline.yaml")
-        print("Deleted ingest-pipeline.yaml")
+    for local_file in ("ingest-pipeline.yaml", "ingest-pipeline.yaml.sha256"):
+        try:
+            os.unlink(local_file)
+        except FileNotFoundError:
+            pass
+        else:
+            print(f"Deleted {local_file}")
     
     print("Pipeline cleanup completed!")
 
@@ -2,80 +2,136 @@ from kfp import dsl
 from kfp import compiler
 from kfp import kubernetes
 from kfp.client import Client
+from concurrent.futures import ThreadPoolExecutor
 
 from llama_stack_client import LlamaStackClient
 from llama_stack_client import RAGDocument
 
+import hashlib
+import json
 import os
+from pathlib import Path
 
-@dsl.component(base_image="python:3.13")
-def create_urls_list() -> list:
-    """Creates a list of document URLs."""
-    urls = [
-        "01-intro.md",
-        "02-deployment-constraints.md",
-        "03-network-security.md",
-        "04-routing-loadbalancing.md",
-        "05-storage-architecture.md",
-        "06-resource-monitoring.md",
-        "07-deployment-procedures.md"
-    ]
-    
-    # Return the URLs list directly
-    return urls
-
-@dsl.component(base_image="python:3.13", packages_to_install=["llama-stack-client"])
-def download_documents(document_urls: list) -> list:
-    """Downloads the documents."""
+# Slim image and pinned client, so component pods start quickly and install the same packages every run
+BASE_IMAGE = "python:3.13-slim"
+LLAMA_STACK_CLIENT_PACKAGE = "llama-stack-client==0.2.20"
+# Serializes the documents artifact, like the app does for its JSON payloads
+ORJSON_PACKAGE = "orjson==3.10.18"
+
+# Documents to ingest, relative to the docs folder of this repository
+DOCUMENT_URLS = [
+    "01-intro.md",
+    "02-deployment-constraints.md",
+    "03-network-security.md",
+    "04-routing-loadbalancing.md",
+    "05-storage-architecture.md",
+    "06-resource-monitoring.md",
+    "07-deployment-procedures.md"
+]
+
+# Document shards downloaded and ingested by parallel tasks
+INGEST_SHARDS = 4
+# Split at compile time, so the shards are part of the pipeline spec instead of a task output
+DOCUMENT_URL_SHARDS = [shard for shard in (DOCUMENT_URLS[i::INGEST_SHARDS] for i in range(INGEST_SHARDS)) if shard]
+
+@dsl.component(base_image=BASE_IMAGE, packages_to_install=[LLAMA_STACK_CLIENT_PACKAGE, ORJSON_PACKAGE])
+def download_documents(document_urls: list, documents: dsl.Output[dsl.Artifact]):
+    """Downloads the documents into a gzip-compressed JSON Lines artifact."""
     
+    from concurrent.futures import ThreadPoolExecutor
     from llama_stack_client import RAGDocument
+    import gzip
+    import httpx
+    import orjson
     
     # The input contains the URLs list directly
     urls = document_urls
     
     document_base_url = "https://raw.githubusercontent.com/alvarolop/intelligent-cd/refs/heads/main/intelligent-cd-docs"
     
-    documents = []
-    for url in urls:
-        doc = RAGDocument(
-            document_id=f"{url}",
-            content=f"{document_base_url}/{url}",
-            mime_type="text/plain",
-            metadata={
-                "source": "https://github.com/alvarolop/intelligent-cd/tree/main/intelligent-cd-docs",
-                "url": f"{document_base_url}/{url}",
-                "title": url,
-                "date": "2025-09-01"
-            },
-        )
-        documents.append(doc)
+    # Fetch every document concurrently over a shared keep-alive connection pool
+    with httpx.Client(base_url=document_base_url, timeout=30.0) as http_client:
+        def fetch(url):
+            response = http_client.get(f"/{url}")
+            response.raise_for_status()
+            return response.text
+        
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            contents = list(executor.map(fetch, urls))
     
-    # Return the documents list directly
-    return documents
+    # Write one document per line; artifacts live in object storage instead of the size-limited parameters
+    with gzip.open(documents.path, "wb") as documents_file:
+        for url, content in zip(urls, contents):
+            doc = RAGDocument(
+                document_id=f"{url}",
+                content=content,
+                mime_type="text/plain",
+                metadata={
+                    "source": "https://github.com/alvarolop/intelligent-cd/tree/main/intelligent-cd-docs",
+                    "url": f"{document_base_url}/{url}",
+                    "title": url,
+                    "date": "2025-09-01"
+                },
+            )
+            documents_file.write(orjson.dumps(doc) + b"\n")
 
-@dsl.component(base_image="python:3.13", packages_to_install=["llama-stack-client"])
-def ingest_documents(documents: list) -> None:
-    """Ingest the documents into the vector database."""
+@dsl.component(base_image=BASE_IMAGE, packages_to_install=[LLAMA_STACK_CLIENT_PACKAGE, ORJSON_PACKAGE])
+def ingest_documents(
+    documents_file: dsl.Input[dsl.Artifact],
+    batch_size: int = 32,
+    chunk_size_in_tokens: int = 512,
+    concurrency: int = 4,
+    log_level: str = "INFO",
+) -> None:
+    """Ingest the documents from the downloaded artifact into the vector database.
     
-    from llama_stack_client import LlamaStackClient
-    import os
-    
-    # The input contains the documents list directly
-    # documents is a list of dictionaries with document data    
-    # print(f"Documents to ingest: {documents}")
+    batch_size documents are sent per insert request, up to concurrency requests at a time, and
+    the RAG tool splits them into chunks of chunk_size_in_tokens; all are pipeline parameters
+    that can be set per run.
+    """
     
-    # Process each document
-    for doc in documents:
-        print(f"Processing document: {doc['document_id']}")
-        print(f"Content: {doc['content']}")
-        print(f"Metadata: {doc['metadata']}")
-    
-    # Initialize client
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+    from llama_stack_client import APIConnectionError, APIStatusError, DefaultHttpxClient, LlamaStackClient
+    import gzip
+    import httpx
+    import itertools
+    import logging
+    import orjson
+    import os
+    import random
+    import time
+
+    logging.basicConfig(level=log_level.upper(), format="%(asctime)s - %(levelname)s - %(message)s")
+    logger = logging.getLogger("ingest")
+
+    # Initialize client with a connection pool sized for the concurrent batches, kept alive between them
+    http_client = DefaultHttpxClient(
+        limits=httpx.Limits(
+            max_connections=concurrency,
+            max_keepalive_connections=concurrency,
+            keepalive_expiry=60
+        ),
+        timeout=httpx.Timeout(180.0, connect=5.0) # 3 minutes, failing fast when unreachable
+    )
+    # The client retries connection errors, timeouts, 429 and 5xx responses with exponential backoff and jitter,
+    # which is safe for the vector database lookup and registration
     client = LlamaStackClient(
         base_url=os.getenv("LLAMA_STACK_URL"),
-        # timeout=httpx.Timeout(120.0, read=5.0, write=10.0, connect=2.0)
-        timeout=180.0 # 3 minutes
+        http_client=http_client,
+        max_retries=5
     )
+    # Inserts are not idempotent: a batch that timed out may still have been written, and sending it
+    # again would duplicate its chunks, so they are only retried when the server never processed them
+    insert_client = client.with_options(max_retries=0)
+    insert_max_attempts = 6
+
+    def insert_not_executed(error):
+        """Whether a failed insert request is known not to have been processed by the server"""
+        if isinstance(error, APIConnectionError):
+            # The connection was never established, so the request was not sent
+            return isinstance(error.__cause__, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+        # Rejected before processing: rate limited or unavailable
+        return isinstance(error, APIStatusError) and error.status_code in (429, 503)
     
     vector_db_id = os.getenv("VECTOR_DB_ID")
     
@@ -83,64 +139,168 @@ def ingest_documents(documents: list) -> None:
     try:
         # Try to get the vector database to check if it exists
         client.vector_dbs.retrieve(vector_db_id=vector_db_id)
-        print(f"Vector database '{vector_db_id}' already exists")
+        logger.info("Vector database '%s' already exists", vector_db_id)
     except Exception as e:
-        print(f"Vector database '{vector_db_id}' does not exist, creating it...")
-        print(f"Error: {e}")
+        logger.info("Vector database '%s' does not exist, creating it... (%s)", vector_db_id, e)
         
         # Create the vector database
-        client.vector_dbs.register(
-            vector_db_id=vector_db_id,
-            embedding_model="granite-embedding-125m",
-            embedding_dimension=768,
-            provider_id="milvus"
-        )
-        print(f"Vector database '{vector_db_id}' created successfully")
+        try:
+            client.vector_dbs.register(
+                vector_db_id=vector_db_id,
+                embedding_model="granite-embedding-125m",
+                embedding_dimension=768,
+                provider_id="milvus"
+            )
+            logger.info("Vector database '%s' created successfully", vector_db_id)
+        except Exception:
+            # Another shard may have registered it in the meantime
+            client.vector_dbs.retrieve(vector_db_id=vector_db_id)
+            logger.info("Vector database '%s' was created by another shard", vector_db_id)
     
-    # Now insert the documents
-    client.tool_runtime.rag_tool.insert(
-        documents=documents,
-        vector_db_id=vector_db_id,
-        chunk_size_in_tokens=512,
-    )
+    # Now insert the documents in batches, so each request stays small and well within the timeout
+    def insert_batch(batch_number, batch):
+        logger.info("Ingesting batch %d: %s", batch_number, [doc['document_id'] for doc in batch])
+        # Document bodies are only dumped when debugging
+        if logger.isEnabledFor(logging.DEBUG):
+            for doc in batch:
+                logger.debug("Document %s\nContent: %s\nMetadata: %s", doc['document_id'], doc['content'], doc['metadata'])
+        
+        batch_start_time = time.perf_counter()
+        for attempt in range(1, insert_max_attempts + 1):
+            try:
+                insert_client.tool_runtime.rag_tool.insert(
+                    documents=batch,
+                    vector_db_id=vector_db_id,
+                    chunk_size_in_tokens=chunk_size_in_tokens,
+                )
+                break
+            except Exception as e:
+                if attempt == insert_max_attempts or not insert_not_executed(e):
+                    raise
+                # Exponential backoff with jitter, so concurrent batches do not retry in lockstep
+                delay = min(2 ** attempt, 30) * random.uniform(0.5, 1.0)
+                logger.warning("Batch %d was not processed (%s), retrying in %.1fs (attempt %d/%d)",
+                               batch_number, e, delay, attempt + 1, insert_max_attempts)
+                time.sleep(delay)
+        logger.info("Inserted batch %d (%d documents) in %.2fs",
+                    batch_number, len(batch), time.perf_counter() - batch_start_time)
+        return len(batch)
+
+    # Batches are read from the artifact (one JSON document per line) as they are needed and sent
+    # concurrently, so at most `concurrency` batches are in memory; any failure fails the task
+    inserted = 0
+    with gzip.open(documents_file.path, "rb") as documents_lines, \
+            ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = set()
+        batches = itertools.batched(map(orjson.loads, documents_lines), batch_size)
+        for batch_number, batch in enumerate(batches, 1):
+            if len(pending) >= concurrency:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                inserted += sum(future.result() for future in done)
+            pending.add(executor.submit(insert_batch, batch_number, list(batch)))
+        inserted += sum(future.result() for future in wait(pending).done)
+    logger.info("Ingested %d documents into '%s'", inserted, vector_db_id)
 
 @dsl.pipeline(name="ingest-pipeline")
-def pipeline():
+def pipeline(batch_size: int = 32, chunk_size_in_tokens: int = 512, concurrency: int = 4, log_level: str = "INFO"):
     
-    # Step 1: Create the URLs list
-    urls = create_urls_list()
+    # Each shard is downloaded and ingested by its own tasks, all shards in parallel
+    with dsl.ParallelFor(DOCUMENT_URL_SHARDS, parallelism=INGEST_SHARDS) as shard_urls:
+        # Step 1: Download the documents
+        documents = download_documents(document_urls=shard_urls)
+        
+        # Step 2: Ingest the documents with secrets handling
+        step2 = ingest_documents(
+            documents_file=documents.output,
+            batch_size=batch_size,
+            chunk_size_in_tokens=chunk_size_in_tokens,
+            concurrency=concurrency,
+            log_level=log_level
+        )
+
+        kubernetes.use_secret_as_env(
+            step2,
+            secret_name='ingestion-secret',
+            secret_key_to_env={
+                'LLAMA_STACK_URL': 'LLAMA_STACK_URL',
+                'VECTOR_DB_ID': 'VECTOR_DB_ID'
+            })
+
+# Helper function to look up resources by name on the server
+def display_name_filter(display_name):
+    """Build a KFP list filter that matches resources by display name on the server."""
+    return json.dumps({
+        "predicates": [{
+            "operation": "EQUALS",
+            "key": "display_name",
+            "string_value": display_name,
+        }]
+    })
+
+# Helper function to compile the pipeline only when this file changed
+def compile_pipeline_if_changed(package_path):
+    """Compile the pipeline unless the package was built from the current source, and return the source hash."""
+    source_hash = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+    hash_path = Path(f"{package_path}.sha256")
     
-    # Step 2: Download the documents
-    documents = download_documents(document_urls=urls.output)
+    if Path(package_path).exists() and hash_path.exists() and hash_path.read_text() == source_hash:
+        print(f"Pipeline source unchanged, reusing {package_path}")
+        return source_hash
     
-    # Step 3: Ingest the documents with secrets handling
-    step3 = ingest_documents(documents=documents.output)
+    compiler.Compiler().compile(
+        pipeline_func=pipeline,
+        package_path=package_path
+    )
+    hash_path.write_text(source_hash)
+    print(f"Pipeline compiled to {package_path}")
+    return source_hash
 
-    kubernetes.use_secret_as_env(
-        step3,
-        secret_name='ingestion-secret',
-        secret_key_to_env={
-            'LLAMA_STACK_URL': 'LLAMA_STACK_URL',
-            'VECTOR_DB_ID': 'VECTOR_DB_ID'
-        })
+# Helper function to get the most recent version of a pipeline
+def get_latest_pipeline_version(client, pipeline_id):
+    """Return the most recently created version of the pipeline, or None if it has none."""
+    pipeline_versions = client.list_pipeline_versions(
+        pipeline_id=pipeline_id,
+        page_size=1,
+        sort_by="created_at desc"
+    )
+    if pipeline_versions and hasattr(pipeline_versions, "pipeline_versions") and pipeline_versions.pipeline_versions:
+        return pipeline_versions.pipeline_versions[0]
+    return None
 
 # Helper function to get or create pipeline
-def get_or_create_pipeline(client, pipeline_name, package_path):
-    """Get existing pipeline or create new one."""
-    existing_pipelines = client.list_pipelines()
+def get_or_create_pipeline(client, pipeline_name, package_path, package_hash):
+    """Get existing pipeline or create new one, uploading a new version only when the package changed.
+    
+    Each version stores the hash of the source it was compiled from in its description.
+    """
+    existing_pipelines = client.list_pipelines(page_size=1, filter=display_name_filter(pipeline_name))
     
-    # Check if pipelines list exists and has items
+    # The server only returns pipelines with a matching name
     if existing_pipelines and hasattr(existing_pipelines, "pipelines") and existing_pipelines.pipelines:
-        for pipeline in existing_pipelines.pipelines:
-            if pipeline.display_name == pipeline_name:
-                print(f"Pipeline '{pipeline_name}' already exists with ID: {pipeline.pipeline_id}")
-                return pipeline
+        pipeline = existing_pipelines.pipelines[0]
+        print(f"Pipeline '{pipeline_name}' already exists with ID: {pipeline.pipeline_id}")
+        
+        latest_version = get_latest_pipeline_version(client, pipeline.pipeline_id)
+        if latest_version is not None and latest_version.description == package_hash:
+            print(f"Pipeline version {latest_version.pipeline_version_id} is up to date")
+        else:
+            print("Pipeline package changed, uploading new pipeline version...")
+            version = client.upload_pipeline_version(
+                pipeline_package_path=package_path,
+                pipeline_version_name=f"{pipeline_name}-{package_hash[:12]}",
+                pipeline_id=pipeline.pipeline_id,
+                description=package_hash
+            )
+            print(f"Pipeline version uploaded successfully with ID: {version.pipeline_version_id}")
+        return pipeline
     
     # Pipeline doesn't exist, create it
     print(f"Pipeline '{pipeline_name}' not found, uploading new pipeline...")
+    # The first version takes the pipeline description, recording the package hash
     pipeline_obj = client.upload_pipeline(
         pipeline_package_path=package_path,
-        pipeline_name=pipeline_name
+        pipeline_name=pipeline_name,
+        description=package_hash
     )
     print(f"Pipeline uploaded successfully with ID: {pipeline_obj.pipeline_id}")
     return pipeline_obj
@@ -148,14 +308,13 @@ def get_or_create_pipeline(client, pipeline_name, package_path):
 # Helper function to get or create experiment
 def get_or_create_experiment(client, experiment_name, description):
     """Get existing experiment or create new one."""
-    existing_experiments = client.list_experiments()
+    existing_experiments = client.list_experiments(page_size=1, filter=display_name_filter(experiment_name))
     
-    # Check if experiments list exists and has items
-    if existing_experiments and hasattr(existing_experiments, "experiments"):
-        for exp in existing_experiments.experiments:
-            if exp.display_name == experiment_name:
-                print(f"Experiment '{experiment_name}' already exists with ID: {exp.experiment_id}")
-                return exp
+    # The server only returns experiments with a matching name
+    if existing_experiments and hasattr(existing_experiments, "experiments") and existing_experiments.experiments:
+        exp = existing_experiments.experiments[0]
+        print(f"Experiment '{experiment_name}' already exists with ID: {exp.experiment_id}")
+        return exp
     
     # Experiment doesn't exist, create it
     print(f"Experiment '{experiment_name}' not found, creating new experiment...")
@@ -169,27 +328,28 @@ def get_or_create_experiment(client, experiment_name, description):
 # Helper function to check if run exists and execute if needed
 def execute_pipeline_if_needed(client, experiment, pipeline_obj, run_name):
     """Check if run exists and execute pipeline if needed."""
-    existing_runs = client.list_runs(experiment_id=experiment.experiment_id)
+    existing_runs = client.list_runs(
+        experiment_id=experiment.experiment_id,
+        page_size=1,
+        filter=display_name_filter(run_name)
+    )
     
-    # Check if runs list exists and has items
+    # The server only returns runs with a matching name
     if existing_runs and hasattr(existing_runs, "runs") and existing_runs.runs:
-        for run in existing_runs.runs:
-            if run.display_name == run_name:
-                print(f"Run '{run_name}' already exists with ID: {run.run_id}")
-                print("Skipping pipeline execution to avoid duplicates.")
-                return run
+        run = existing_runs.runs[0]
+        print(f"Run '{run_name}' already exists with ID: {run.run_id}")
+        print("Skipping pipeline execution to avoid duplicates.")
+        return run
     
     # Run doesn't exist, execute pipeline
     print("Starting new pipeline execution...")
     
-    # First, retrieve the first version of the pipeline
-    pipeline_versions = client.list_pipeline_versions(pipeline_id=pipeline_obj.pipeline_id)
-    if pipeline_versions and hasattr(pipeline_versions, "pipeline_versions") and pipeline_versions.pipeline_versions:
-        # Just get the first version from the array
-        version_id = pipeline_versions.pipeline_versions[0].pipeline_version_id
-        print(f"Using pipeline version: {version_id}")
-    else:
+    # First, retrieve the latest version of the pipeline
+    latest_version = get_latest_pipeline_version(client, pipeline_obj.pipeline_id)
+    if latest_version is None:
         raise RuntimeError("No versions found for the pipeline to execute.")
+    version_id = latest_version.pipeline_version_id
+    print(f"Using pipeline version: {version_id}")
     
     # Then, run the pipeline with the retrieved version
     run_result = client.run_pipeline(
@@ -214,23 +374,24 @@ if __name__ == "__main__":
         existing_token=bearer_token
     )
 
-    # 2. Create pipeline object
-    pipeline_package = compiler.Compiler().compile(
-        pipeline_func=pipeline,
-        package_path="ingest-pipeline.yaml"
-    )
+    # 2. Get or create experiment in the background, it does not depend on the pipeline
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        experiment_future = executor.submit(
+            get_or_create_experiment,
+            kfp_client, 
+            "ingest-experiment", 
+            "Runs our pipeline to ingest documents into the vector database"
+        )
 
-    # 3. Get or create pipeline
-    pipeline_obj = get_or_create_pipeline(kfp_client, "ingest-pipeline", "ingest-pipeline.yaml")
-    print(f"Pipeline ready with ID: {pipeline_obj.pipeline_id}")
+        # 3. Create pipeline object, skipping the compilation when the source is unchanged
+        pipeline_hash = compile_pipeline_if_changed("ingest-pipeline.yaml")
 
-    # 4. Get or create experiment
-    experiment = get_or_create_experiment(
-        kfp_client, 
-        "ingest-experiment", 
-        "Runs our pipeline to ingest documents into the vector database"
-    )
-    print(f"Experiment ready with ID: {experiment.experiment_id}")
+        # 4. Get or create pipeline
+        pipeline_obj = get_or_create_pipeline(kfp_client, "ingest-pipeline", "ingest-pipeline.yaml", pipeline_hash)
+        print(f"Pipeline ready with ID: {pipeline_obj.pipeline_id}")
+
+        experiment = experiment_future.result()
+        print(f"Experiment ready with ID: {experiment.experiment_id}")
 
     # 5. Execute pipeline if needed
     run_result = execute_pipeline_if_needed(kfp_client, experiment, pipeline_obj, "ingest-execution") 